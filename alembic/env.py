@@ -3,7 +3,7 @@ import sys
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
-from sqlalchemy import pool
+from sqlalchemy import pool, text
 
 from alembic import context
 
@@ -23,6 +23,9 @@ if config.config_file_name is not None:
 # Set target metadata for autogenerate
 target_metadata = Base.metadata
 
+# Arbitrary app-wide key for pg_advisory_lock
+MIGRATION_LOCK_KEY = 7_202_611
+
 # Get database URL from environment
 def get_url():
     use_sqlite = os.getenv("USE_SQLITE", "0") == "1"
@@ -71,13 +74,24 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection, 
-            target_metadata=target_metadata
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        # Serialize concurrent runners (e.g. several containers starting at once)
+        use_lock = connection.dialect.name == "postgresql"
+        if use_lock:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+
+        try:
+            context.configure(
+                connection=connection, 
+                target_metadata=target_metadata
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if use_lock:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                connection.commit()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,43 @@
+"""Add trigram indexes for title/author substring search
+
+Revision ID: 0a6d3b9e7c21
+Revises: f52d8e0c1a94
+Create Date: 2026-10-16 15:02:47.118254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d3b9e7c21'
+down_revision: Union[str, Sequence[str], None] = 'f52d8e0c1a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Plain lower() btrees from create_all-built databases; LIKE '%term%' never used them
+    op.execute("DROP INDEX IF EXISTS idx_books_title_lower")
+    op.execute("DROP INDEX IF EXISTS idx_books_author_lower")
+    op.execute(
+        "CREATE INDEX idx_books_title_trgm ON books "
+        "USING gin (lower(coalesce(title, '')) gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX idx_books_author_trgm ON books "
+        "USING gin (lower(coalesce(author, '')) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('idx_books_author_trgm', table_name='books')
+    op.drop_index('idx_books_title_trgm', table_name='books')
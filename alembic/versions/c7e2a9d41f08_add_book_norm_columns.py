@@ -0,0 +1,63 @@
+"""Add normalized title/author columns
+
+Revision ID: c7e2a9d41f08
+Revises: b4137bddfb3a
+Create Date: 2026-02-10 18:04:12.318547
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a9d41f08'
+down_revision: Union[str, Sequence[str], None] = 'b4137bddfb3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def normalize_key(text: str) -> str:
+    """Frozen copy of src.db.models.normalize_key as of this revision, so the
+    backfill does not change if the app's normalization does."""
+    return " ".join("".join(c for c in text.lower() if c.isalnum() or c.isspace()).split())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('title_norm', sa.Text(), nullable=True))
+    op.add_column('books', sa.Column('author_norm', sa.Text(), nullable=True))
+
+    # Backfill existing rows with the same normalization the ORM applies on write
+    books = sa.table(
+        'books',
+        sa.column('id', sa.Integer),
+        sa.column('title', sa.Text),
+        sa.column('author', sa.Text),
+        sa.column('title_norm', sa.Text),
+        sa.column('author_norm', sa.Text),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(books.c.id, books.c.title, books.c.author)).fetchall()
+    updates = [
+        {
+            'row_id': row_id,
+            'title_norm': normalize_key(title) if title else None,
+            'author_norm': normalize_key(author) if author else None,
+        }
+        for row_id, title, author in rows
+    ]
+    if updates:
+        conn.execute(
+            books.update()
+            .where(books.c.id == sa.bindparam('row_id'))
+            .values(title_norm=sa.bindparam('title_norm'), author_norm=sa.bindparam('author_norm')),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'author_norm')
+    op.drop_column('books', 'title_norm')
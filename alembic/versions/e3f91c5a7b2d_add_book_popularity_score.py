@@ -0,0 +1,90 @@
+"""Add precomputed popularity_score column
+
+Revision ID: e3f91c5a7b2d
+Revises: c7e2a9d41f08
+Create Date: 2026-10-16 11:42:07.904113
+
+"""
+import math
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f91c5a7b2d'
+down_revision: Union[str, Sequence[str], None] = 'c7e2a9d41f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def popularity_from_fields(
+    ratings_average: Optional[float],
+    ratings_count: Optional[int],
+    want_to_read_count: Optional[int],
+    edition_count: Optional[int],
+) -> float:
+    """Frozen copy of src.enrichment.openlibrary.popularity_from_fields as of
+    this revision, so the backfill does not change if the app's scoring does."""
+    score = 1.0
+    if ratings_average and ratings_count and ratings_count >= 10:
+        score += (ratings_average / 5.0) * 0.3
+    if want_to_read_count:
+        score += min(0.2, math.log10(max(1, want_to_read_count)) / 20)
+    if edition_count:
+        score += min(0.1, edition_count / 100)
+    return min(2.0, score)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('popularity_score', sa.Float(), nullable=True))
+
+    # Backfill already-enriched rows with the score the enrichment service now stores
+    books = sa.table(
+        'books',
+        sa.column('id', sa.Integer),
+        sa.column('ratings_average', sa.Float),
+        sa.column('ratings_count', sa.BigInteger),
+        sa.column('want_to_read_count', sa.BigInteger),
+        sa.column('edition_count', sa.Integer),
+        sa.column('popularity_score', sa.Float),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(
+            books.c.id,
+            books.c.ratings_average,
+            books.c.ratings_count,
+            books.c.want_to_read_count,
+            books.c.edition_count,
+        ).where(
+            sa.or_(
+                books.c.ratings_average.isnot(None),
+                books.c.want_to_read_count.isnot(None),
+                books.c.edition_count.isnot(None),
+            )
+        )
+    ).fetchall()
+    updates = [
+        {
+            'row_id': row_id,
+            'popularity_score': popularity_from_fields(
+                ratings_average, ratings_count, want_to_read_count, edition_count
+            ),
+        }
+        for row_id, ratings_average, ratings_count, want_to_read_count, edition_count in rows
+    ]
+    if updates:
+        conn.execute(
+            books.update()
+            .where(books.c.id == sa.bindparam('row_id'))
+            .values(popularity_score=sa.bindparam('popularity_score')),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'popularity_score')
@@ -0,0 +1,46 @@
+"""Add lowercased title column
+
+Revision ID: f52d8e0c1a94
+Revises: e3f91c5a7b2d
+Create Date: 2026-10-16 14:20:31.557802
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f52d8e0c1a94'
+down_revision: Union[str, Sequence[str], None] = 'e3f91c5a7b2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('title_lower', sa.Text(), nullable=True))
+
+    # Backfill with Python's str.lower(), the same function the ORM applies on write
+    books = sa.table(
+        'books',
+        sa.column('id', sa.Integer),
+        sa.column('title', sa.Text),
+        sa.column('title_lower', sa.Text),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(books.c.id, books.c.title).where(books.c.title.isnot(None))).fetchall()
+    updates = [{'row_id': row_id, 'title_lower': title.lower()} for row_id, title in rows]
+    if updates:
+        conn.execute(
+            books.update()
+            .where(books.c.id == sa.bindparam('row_id'))
+            .values(title_lower=sa.bindparam('title_lower')),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'title_lower')
@@ -3,6 +3,7 @@ use deunicode::deunicode;
 use once_cell::sync::Lazy;
 use pyo3::prelude::*;
 use rust_stemmers::{Algorithm, Stemmer};
+use rustc_hash::FxHashSet;
 use std::borrow::Cow;
 
 static STEMMER: Lazy<Stemmer> = Lazy::new(|| Stemmer::create(Algorithm::Portuguese));
@@ -10,6 +11,17 @@ static STEMMER: Lazy<Stemmer> = Lazy::new(|| Stemmer::create(Algorithm::Portugue
 const MIN_TOKEN_LEN: usize = 2;
 const MAX_TOKEN_LEN: usize = 25;
 
+/// Collects a Python iterable of strings (list, set, frozenset) into the hash
+/// set that tokens are filtered against. Every entry point that takes
+/// stopwords goes through this, so callers can pass `load_stopwords()` as is.
+pub fn stopword_set(words: &Bound<'_, PyAny>) -> PyResult<FxHashSet<String>> {
+    let mut stopwords = FxHashSet::default();
+    for word in words.try_iter()? {
+        stopwords.insert(word?.extract::<String>()?);
+    }
+    Ok(stopwords)
+}
+
 #[pyfunction]
 pub fn analyze(text: &str) -> Vec<String> {
     deunicode(text)
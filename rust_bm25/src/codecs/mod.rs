@@ -97,7 +97,14 @@ pub fn decode_postings_separated(
     result
 }
 
-fn decompress_block(
+/// Decodes one bit-packed block starting at its width header byte and
+/// returns the position just past it.
+///
+/// `BitPacker4x` already holds a fully unrolled kernel per bit width and
+/// picks the SIMD or scalar variant once in `BitPacker4x::new()`, so the
+/// only dispatch here is a single jump on the header per 128 values.
+#[inline(always)]
+pub fn decompress_block(
     packer: &BitPacker4x,
     data: &[u8],
     mut pos: usize,
@@ -156,9 +163,46 @@ pub fn decode_postings(data: &[u8]) -> Vec<(u32, u32)> {
 
 #[pyfunction]
 pub fn merge_postings(py: Python<'_>, a: &[u8], b: &[u8]) -> Py<PyBytes> {
+    PyBytes::new(py, &merge_postings_internal(a, b)).into()
+}
+
+pub fn merge_postings_internal(a: &[u8], b: &[u8]) -> Vec<u8> {
+    if a.is_empty() {
+        return b.to_vec();
+    }
+    if b.is_empty() {
+        return a.to_vec();
+    }
+
+    // Append fast path (incremental indexing hands out increasing doc ids):
+    // when every doc in `b` follows `a`, only b's first gap needs re-basing;
+    // the remaining bytes of both lists are reused without decoding.
+    let a_last = last_doc_id(a);
+    let (b_first, pos) = decode_varint(b, 0);
+    if b_first > a_last {
+        let mut result = Vec::with_capacity(a.len() + b.len() + 4);
+        result.extend_from_slice(a);
+        encode_varint(b_first - a_last, &mut result);
+        result.extend_from_slice(&b[pos..]);
+        return result;
+    }
+
     let mut postings = decode_postings_internal(a);
     postings.extend(decode_postings_internal(b));
-    PyBytes::new(py, &encode_postings_internal(&postings)).into()
+    encode_postings_internal(&postings)
+}
+
+/// Walks the (delta, tf) varint pairs without allocating and returns the last doc id.
+fn last_doc_id(data: &[u8]) -> u32 {
+    let mut pos = 0;
+    let mut doc_id = 0u32;
+    while pos < data.len() {
+        let (delta, new_pos) = decode_varint(data, pos);
+        let (_, new_pos) = decode_varint(data, new_pos);
+        pos = new_pos;
+        doc_id += delta;
+    }
+    doc_id
 }
 
 fn encode_varint(mut value: u32, buf: &mut Vec<u8>) {
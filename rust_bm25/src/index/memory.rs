@@ -1,4 +1,4 @@
-use crate::analysis::analyze;
+use crate::analysis::{analyze, stopword_set};
 use crate::codecs::{decode_postings_internal, encode_postings_internal};
 use crate::document::parsers::{chunk_text, parse_file};
 use pyo3::prelude::*;
@@ -275,13 +275,14 @@ pub fn process_batch(
     overlap: usize,
     start_doc_id: u32,
     chunks_dir: String,
-    stopwords: Vec<String>,
-) -> (
+    stopwords: &Bound<'_, PyAny>,
+) -> PyResult<(
     Vec<(u32, String)>,
     Vec<(String, u32, Py<PyBytes>)>,
     u64,
     u32,
-) {
+)> {
+    let stopwords_set = stopword_set(stopwords)?;
     let (all_chunk_records, all_terms_raw, total_len, count) = py.detach(|| {
         process_batch_internal(
             paths,
@@ -290,7 +291,7 @@ pub fn process_batch(
             overlap,
             start_doc_id,
             &chunks_dir,
-            stopwords,
+            &stopwords_set,
         )
     });
 
@@ -299,7 +300,7 @@ pub fn process_batch(
         .map(|(term, df, encoded)| (term, df, PyBytes::new(py, &encoded).into()))
         .collect();
 
-    (all_chunk_records, terms_result, total_len, count)
+    Ok((all_chunk_records, terms_result, total_len, count))
 }
 
 fn process_batch_internal(
@@ -309,9 +310,8 @@ fn process_batch_internal(
     overlap: usize,
     start_doc_id: u32,
     chunks_dir: &str,
-    stopwords: Vec<String>,
+    stopwords_set: &FxHashSet<String>,
 ) -> (Vec<(u32, String)>, Vec<(String, u32, Vec<u8>)>, u64, u32) {
-    let stopwords_set: FxHashSet<String> = stopwords.into_iter().collect();
     let next_doc_id = AtomicU32::new(start_doc_id);
     let chunks_dir = Path::new(chunks_dir);
 
@@ -325,7 +325,7 @@ fn process_batch_internal(
                 chunk_size,
                 overlap,
                 chunks_dir,
-                &stopwords_set,
+                stopwords_set,
                 &next_doc_id,
             )
         })
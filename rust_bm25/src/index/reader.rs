@@ -1,3 +1,4 @@
+use crate::codecs::decompress_block;
 use crate::index::segment::SegmentMeta;
 use bitpacking::{BitPacker, BitPacker4x};
 use fst::automaton::Levenshtein;
@@ -8,6 +9,15 @@ use std::path::Path;
 
 const BLOCK_LEN: usize = 128;
 const OFFSET_SIZE: usize = 28;
+const BLOCK_MAX_SIZE: usize = 12;
+
+/// Upper-bound inputs for one full postings block, read from block_max.bin.
+#[derive(Clone, Copy, Debug)]
+pub struct BlockMax {
+    pub last_doc: u32,
+    pub max_tf: u32,
+    pub min_doc_len: u32,
+}
 
 pub struct SegmentReader {
     pub terms_fst: FstMap<Mmap>,
@@ -16,6 +26,9 @@ pub struct SegmentReader {
     pub postings_freqs_mmap: Mmap,
     pub chunks_mmap: Mmap,
     pub doc_lengths_mmap: Mmap,
+    /// Absent for segments written before block-max skip data existed;
+    /// their postings are then always decoded in full.
+    pub block_max_mmap: Option<Mmap>,
     pub base_doc_id: u32,
     pub num_docs: u32,
 }
@@ -28,6 +41,7 @@ impl SegmentReader {
         let postings_freqs_mmap = Self::mmap_file(segment_dir.join("postings_freqs.bin"))?;
         let chunks_mmap = Self::mmap_file(segment_dir.join("chunks.bin"))?;
         let doc_lengths_mmap = Self::mmap_file(segment_dir.join("doc_lengths.bin"))?;
+        let block_max_mmap = Self::mmap_file(segment_dir.join("block_max.bin")).ok();
 
         let meta: SegmentMeta =
             serde_json::from_str(&fs::read_to_string(segment_dir.join("meta.json"))?)
@@ -40,6 +54,7 @@ impl SegmentReader {
             postings_freqs_mmap,
             chunks_mmap,
             doc_lengths_mmap,
+            block_max_mmap,
             base_doc_id: meta.base_doc_id,
             num_docs: meta.num_docs,
         })
@@ -94,6 +109,54 @@ impl SegmentReader {
         ))
     }
 
+    /// Skip entries for the full blocks of `term`, in posting order. Empty when
+    /// the segment has no block_max.bin or the term has fewer than 128 postings.
+    pub fn get_block_maxes(&self, term: &str) -> Vec<BlockMax> {
+        let (Some(mmap), Some(idx)) = (&self.block_max_mmap, self.terms_fst.get(term)) else {
+            return vec![];
+        };
+        let idx = idx as usize;
+        let (Some(start), Some(end)) = (
+            self.read_u32(mmap, idx * 4),
+            self.read_u32(mmap, (idx + 1) * 4),
+        ) else {
+            return vec![];
+        };
+
+        let entries_base = (self.terms_fst.len() + 1) * 4;
+        (start as usize..end as usize)
+            .map_while(|entry| {
+                let pos = entries_base + entry * BLOCK_MAX_SIZE;
+                Some(BlockMax {
+                    last_doc: self.read_u32(mmap, pos)?,
+                    max_tf: self.read_u32(mmap, pos + 4)?,
+                    min_doc_len: self.read_u32(mmap, pos + 8)?,
+                })
+            })
+            .collect()
+    }
+
+    /// Asks the kernel to start reading the segment's files into the page
+    /// cache, so the first queries after startup don't stall on page faults.
+    /// Advisory only: errors are ignored and nothing is locked in memory.
+    pub fn prefetch(&self) {
+        #[cfg(unix)]
+        {
+            use memmap2::Advice;
+            let mmaps = [
+                Some(self.terms_fst.as_fst().as_inner()),
+                Some(&self.offsets_mmap),
+                Some(&self.postings_docs_mmap),
+                Some(&self.postings_freqs_mmap),
+                Some(&self.chunks_mmap),
+                self.block_max_mmap.as_ref(),
+            ];
+            for mmap in mmaps.into_iter().flatten() {
+                let _ = mmap.advise(Advice::WillNeed);
+            }
+        }
+    }
+
     pub fn get_doc_length(&self, global_doc_id: u32) -> Option<u32> {
         let local_id = global_doc_id.checked_sub(self.base_doc_id)?;
         if local_id >= self.num_docs {
@@ -175,27 +238,18 @@ impl<'a> PostingsIter<'a> {
 
     fn refill_buffer(&mut self) {
         if self.count_left >= BLOCK_LEN {
-            // Inline decompress for doc_buffer
-            let bits = self.doc_data[self.doc_pos];
-            self.doc_pos += 1;
-            let bytes = (bits as usize) * 16;
-            self.bitpacker.decompress(
-                &self.doc_data[self.doc_pos..self.doc_pos + bytes],
+            self.doc_pos = decompress_block(
+                &self.bitpacker,
+                self.doc_data,
+                self.doc_pos,
                 &mut self.doc_buffer,
-                bits,
             );
-            self.doc_pos += bytes;
-
-            // Inline decompress for freq_buffer
-            let bits = self.freq_data[self.freq_pos];
-            self.freq_pos += 1;
-            let bytes = (bits as usize) * 16;
-            self.bitpacker.decompress(
-                &self.freq_data[self.freq_pos..self.freq_pos + bytes],
+            self.freq_pos = decompress_block(
+                &self.bitpacker,
+                self.freq_data,
+                self.freq_pos,
                 &mut self.freq_buffer,
-                bits,
             );
-            self.freq_pos += bytes;
 
             self.buffer_len = BLOCK_LEN;
         } else {
@@ -213,6 +267,31 @@ impl<'a> PostingsIter<'a> {
         self.buffer_idx = 0;
     }
 
+    /// True when the next posting starts a new block, i.e. `skip_block` is allowed.
+    #[inline]
+    pub fn at_block_start(&self) -> bool {
+        self.buffer_idx >= self.buffer_len
+    }
+
+    /// Postings not yet returned (including any in a skipped block).
+    #[inline]
+    pub fn remaining(&self) -> usize {
+        self.count_left
+    }
+
+    /// Steps over the next full bit-packed block without decompressing it.
+    /// Must be called at a block start with at least `BLOCK_LEN` postings left;
+    /// `last_doc` comes from the block's `BlockMax` and re-bases the deltas
+    /// of the block after it.
+    pub fn skip_block(&mut self, last_doc: u32) {
+        debug_assert!(self.at_block_start() && self.count_left >= BLOCK_LEN);
+        // A packed block is one bit-width header byte plus 128 * bits / 8 bytes
+        self.doc_pos += 1 + self.doc_data[self.doc_pos] as usize * 16;
+        self.freq_pos += 1 + self.freq_data[self.freq_pos] as usize * 16;
+        self.current_doc = last_doc;
+        self.count_left -= BLOCK_LEN;
+    }
+
     fn decode_varint_static(data: &[u8], mut pos: usize) -> (u32, usize) {
         let mut result = 0u32;
         let mut shift = 0;
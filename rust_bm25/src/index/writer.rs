@@ -1,4 +1,4 @@
-use crate::analysis::analyze_arena;
+use crate::analysis::{analyze_arena, stopword_set};
 use crate::codecs::encode_postings_separated;
 use crate::document::parsers::{chunk_text, parse_file};
 use crate::index::segment::{BatchData, IndexMeta, ProcessedDoc, SegmentMeta};
@@ -13,6 +13,7 @@ use std::path::Path;
 use std::thread;
 
 const OFFSET_SIZE: usize = 28;
+const BLOCK_LEN: usize = 128;
 
 pub(crate) fn write_segment(data: BatchData) -> std::io::Result<SegmentMeta> {
     fs::create_dir_all(&data.segment_dir)?;
@@ -40,6 +41,7 @@ pub(crate) fn write_segment(data: BatchData) -> std::io::Result<SegmentMeta> {
     let fst_bytes = build_fst(term_offsets)?;
     let chunks_blob = build_chunks_blob(&book_ids, &chunk_to_book);
     let lengths_blob = build_lengths_blob(&doc_lengths);
+    let block_max_blob = build_block_max_blob(&sorted_terms, &doc_lengths, data.base_doc_id);
 
     write_segment_files(
         &data.segment_dir,
@@ -50,6 +52,7 @@ pub(crate) fn write_segment(data: BatchData) -> std::io::Result<SegmentMeta> {
         &chunks_blob,
         &lengths_blob,
     )?;
+    fs::write(data.segment_dir.join("block_max.bin"), block_max_blob)?;
 
     let meta = SegmentMeta {
         num_docs: chunk_to_book.len() as u32,
@@ -193,6 +196,44 @@ fn build_lengths_blob(doc_lengths: &[u32]) -> Vec<u8> {
     blob
 }
 
+/// Skip data for every full bit-packed block: the block's last doc id, its
+/// max tf and its shortest doc, which bound the block's BM25 contribution
+/// without decoding it. Layout: `num_terms + 1` u32 entry indices (term
+/// ordinal order, like offsets.bin), then 12-byte `(last_doc, max_tf,
+/// min_doc_len)` entries. The varint tail of a posting list has no entry.
+fn build_block_max_blob(
+    sorted_terms: &[(String, Vec<(u32, u32)>)],
+    doc_lengths: &[u32],
+    base_doc_id: u32,
+) -> Vec<u8> {
+    let num_blocks: usize = sorted_terms.iter().map(|(_, p)| p.len() / BLOCK_LEN).sum();
+    let mut blob = Vec::with_capacity((sorted_terms.len() + 1) * 4 + num_blocks * 12);
+    let mut entries = Vec::with_capacity(num_blocks * 12);
+    let mut entry_idx = 0u32;
+
+    for (_, postings) in sorted_terms {
+        blob.extend_from_slice(&entry_idx.to_le_bytes());
+        // Postings are pushed in doc id order by build_inverted_index, which is
+        // the order encode_postings_separated packs them in
+        for block in postings.chunks_exact(BLOCK_LEN) {
+            let last_doc = block[BLOCK_LEN - 1].0;
+            let max_tf = block.iter().map(|&(_, tf)| tf).max().unwrap_or(0);
+            let min_doc_len = block
+                .iter()
+                .map(|&(doc_id, _)| doc_lengths[(doc_id - base_doc_id) as usize])
+                .min()
+                .unwrap_or(0);
+            entries.extend_from_slice(&last_doc.to_le_bytes());
+            entries.extend_from_slice(&max_tf.to_le_bytes());
+            entries.extend_from_slice(&min_doc_len.to_le_bytes());
+            entry_idx += 1;
+        }
+    }
+    blob.extend_from_slice(&entry_idx.to_le_bytes());
+    blob.extend_from_slice(&entries);
+    blob
+}
+
 fn write_segment_files(
     segment_dir: &Path,
     docs_blob: &[u8],
@@ -231,18 +272,19 @@ fn spawn_writer_thread(
 }
 
 #[pyfunction]
-#[pyo3(signature = (books_dir, index_dir, chunks_dir, stopwords, chunk_size=1000, chunk_overlap=100, batch_size=100))]
+#[pyo3(signature = (books_dir, index_dir, chunks_dir, stopwords, chunk_size=1000, chunk_overlap=100, batch_size=100, file_list=None))]
 pub fn index_corpus_file(
     py: Python<'_>,
     books_dir: String,
     index_dir: String,
     chunks_dir: String,
-    stopwords: Vec<String>,
+    stopwords: &Bound<'_, PyAny>,
     chunk_size: usize,
     chunk_overlap: usize,
     batch_size: usize,
+    file_list: Option<Vec<String>>,
 ) -> PyResult<(u32, u32)> {
-    let stopwords_set: FxHashSet<String> = stopwords.into_iter().collect();
+    let stopwords_set = stopword_set(stopwords)?;
     py.detach(|| {
         index_corpus_internal(
             &books_dir,
@@ -252,6 +294,7 @@ pub fn index_corpus_file(
             chunk_size,
             chunk_overlap,
             batch_size,
+            file_list,
         )
     })
 }
@@ -264,6 +307,7 @@ fn index_corpus_internal(
     chunk_size: usize,
     chunk_overlap: usize,
     batch_size: usize,
+    file_list: Option<Vec<String>>,
 ) -> PyResult<(u32, u32)> {
     use std::time::Instant;
 
@@ -272,7 +316,8 @@ fn index_corpus_internal(
     fs::create_dir_all(index_path).ok();
     fs::create_dir_all(chunks_dir).ok();
 
-    let book_files = collect_book_files(books_dir);
+    // An explicit file list skips the directory walk entirely
+    let book_files = file_list.unwrap_or_else(|| collect_book_files(books_dir));
     println!("Found {} files in {:?}", book_files.len(), start.elapsed());
 
     let (tx, rx) = bounded::<BatchData>(1);
@@ -347,15 +392,19 @@ fn collect_book_files(books_dir: &str) -> Vec<String> {
         format!("{}/*.pdf", books_dir),
     ];
 
-    let mut files = Vec::new();
-    for pattern in &patterns {
-        if let Ok(entries) = glob(pattern) {
-            for entry in entries.flatten() {
-                files.push(entry.to_string_lossy().to_string());
-            }
-        }
-    }
-    files
+    let mut files: Vec<(u64, String)> = patterns
+        .par_iter()
+        .flat_map_iter(|pattern| glob(pattern).into_iter().flatten().flatten())
+        .map(|entry| {
+            let size = fs::metadata(&entry).map(|m| m.len()).unwrap_or(0);
+            (size, entry.to_string_lossy().to_string())
+        })
+        .collect();
+
+    // Largest books first so each rayon batch starts on the long parses
+    // instead of finishing on them.
+    files.par_sort_unstable_by(|a, b| b.0.cmp(&a.0).then_with(|| a.1.cmp(&b.1)));
+    files.into_iter().map(|(_, path)| path).collect()
 }
 
 fn process_batch(
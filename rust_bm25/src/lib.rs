@@ -14,6 +14,7 @@ use index::memory::{process_batch, process_books_to_index, BM25Index};
 use index::realtime::RealTimeIndexer;
 use index::writer::index_corpus_file;
 use pipeline::run_streaming_pipeline;
+use search::ranking::rank_with_boosts;
 use search::searcher::FileSearcher;
 use search::wand::WandSearcher;
 
@@ -36,5 +37,6 @@ fn rust_bm25(m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(file_hashes_batch, m)?)?;
     m.add_function(wrap_pyfunction!(index_corpus_file, m)?)?;
     m.add_function(wrap_pyfunction!(run_streaming_pipeline, m)?)?;
+    m.add_function(wrap_pyfunction!(rank_with_boosts, m)?)?;
     Ok(())
 }
@@ -1,3 +1,4 @@
+use crate::analysis::stopword_set;
 use crate::document::parsers::{chunk_text, parse_bytes};
 use crate::index::segment::{BatchData, ProcessedDoc};
 use crate::index::writer::write_segment;
@@ -28,8 +29,9 @@ pub fn run_streaming_pipeline(
     items: Vec<(String, String, String)>,
     index_dir: String,
     chunks_dir: String,
-    stopwords: Vec<String>,
+    stopwords: &Bound<'_, PyAny>,
 ) -> PyResult<()> {
+    let stopwords = stopword_set(stopwords)?;
     py.detach(|| run_pipeline_internal(items, index_dir, chunks_dir, stopwords))
 }
 
@@ -37,14 +39,14 @@ fn run_pipeline_internal(
     items: Vec<(String, String, String)>,
     index_dir: String,
     chunks_dir: String,
-    stopwords: Vec<String>,
+    stopwords: FxHashSet<String>,
 ) -> PyResult<()> {
     let rt = Runtime::new().map_err(|e| pyo3::exceptions::PyIOError::new_err(e.to_string()))?;
 
     let config = Arc::new(PipelineConfig {
         index_dir: PathBuf::from(&index_dir),
         chunks_dir: PathBuf::from(&chunks_dir),
-        stopwords: Arc::new(stopwords.into_iter().collect()),
+        stopwords: Arc::new(stopwords),
     });
 
     fs::create_dir_all(&config.chunks_dir).ok();
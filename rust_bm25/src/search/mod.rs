@@ -1,2 +1,3 @@
+pub mod ranking;
 pub mod searcher;
 pub mod wand;
@@ -0,0 +1,173 @@
+use pyo3::prelude::*;
+use rustc_hash::FxHashMap;
+use std::borrow::Cow;
+use std::cmp::Ordering;
+
+const TITLE_BOOST: f64 = 1.5;
+const AUTHOR_BOOST: f64 = 2.0;
+
+/// Per-book metadata for `rank_with_boosts`: either raw `(title, author)`,
+/// or `(title_lower, title_norm, author_norm)` as stored on the books row,
+/// which skips the per-query lowercasing and normalization.
+#[derive(FromPyObject)]
+pub enum BookKey {
+    Raw(String, String),
+    Normalized(String, String, String),
+}
+
+/// Applies title/author boosts to raw `(book_id, score, chunk_id)` hits and
+/// keeps the best hit per normalized `(title, author)` pair.
+///
+/// `meta` maps book_id to a `BookKey` tuple; hits without metadata are dropped.
+/// `popularity` optionally maps book_id to a stored popularity multiplier
+/// (books missing from it count as 1.0). Scores are f64 so results match the
+/// same arithmetic done on Python floats.
+/// Returns up to `top_k` `(score, book_id)` pairs sorted by descending score.
+#[pyfunction]
+#[pyo3(signature = (raw, meta, query, top_k, popularity=None))]
+pub fn rank_with_boosts(
+    py: Python<'_>,
+    raw: Vec<(String, f64, u32)>,
+    meta: FxHashMap<String, BookKey>,
+    query: &str,
+    top_k: usize,
+    popularity: Option<FxHashMap<String, f64>>,
+) -> Vec<(f64, String)> {
+    py.detach(|| rank_hits(&raw, &meta, query, top_k, popularity.as_ref()))
+}
+
+fn rank_hits(
+    raw: &[(String, f64, u32)],
+    meta: &FxHashMap<String, BookKey>,
+    query: &str,
+    top_k: usize,
+    popularity: Option<&FxHashMap<String, f64>>,
+) -> Vec<(f64, String)> {
+    let query_norm = query.to_lowercase();
+    // Usually 1-3 tokens: scanning each author key for them beats hashing
+    // every author token
+    let mut query_tokens: Vec<&str> = query_norm.split_whitespace().collect();
+    query_tokens.sort_unstable();
+    query_tokens.dedup();
+
+    // Stored keys are borrowed from `meta`; only raw entries allocate. Each
+    // entry is (score, first-seen rank of its key, book_id); the rank breaks
+    // score ties in insertion order, as a stable sort over a dict would
+    let mut unique_books: FxHashMap<(Cow<'_, str>, Cow<'_, str>), (f64, usize, &str)> =
+        FxHashMap::default();
+
+    // Boosts depend only on the book, so only each book's best chunk can win:
+    // collapse to one hit per book_id, in first-seen order, before any
+    // per-book work
+    let mut book_slots: FxHashMap<&str, usize> = FxHashMap::default();
+    let mut books: Vec<(&str, f64)> = Vec::new();
+    for (book_id, base_score, _) in raw {
+        match book_slots.get(book_id.as_str()) {
+            Some(&slot) => {
+                if *base_score > books[slot].1 {
+                    books[slot].1 = *base_score;
+                }
+            }
+            None => {
+                book_slots.insert(book_id.as_str(), books.len());
+                books.push((book_id.as_str(), *base_score));
+            }
+        }
+    }
+
+    for (book_id, base_score) in books {
+        let (title_lower, title_norm, author_norm) = match meta.get(book_id) {
+            Some(BookKey::Raw(title, author)) => {
+                let title_lower = title.to_lowercase();
+                let title_norm = normalize_key(&title_lower);
+                let author_norm = normalize_key(&author.to_lowercase());
+                (
+                    Cow::Owned(title_lower),
+                    Cow::Owned(title_norm),
+                    Cow::Owned(author_norm),
+                )
+            }
+            Some(BookKey::Normalized(title_lower, title_norm, author_norm)) => (
+                Cow::Borrowed(title_lower.as_str()),
+                Cow::Borrowed(title_norm.as_str()),
+                Cow::Borrowed(author_norm.as_str()),
+            ),
+            None => continue,
+        };
+
+        let mut score = base_score;
+        if title_lower.contains(query_norm.as_str()) {
+            score *= TITLE_BOOST;
+        }
+        if query_tokens.iter().any(|t| contains_token(&author_norm, t)) {
+            score *= AUTHOR_BOOST;
+        }
+        if let Some(mult) = popularity.and_then(|p| p.get(book_id)) {
+            score *= *mult;
+        }
+
+        let next_rank = unique_books.len();
+        let best = unique_books
+            .entry((title_norm, author_norm))
+            .or_insert((score, next_rank, book_id));
+        if score > best.0 {
+            best.0 = score;
+            best.2 = book_id;
+        }
+    }
+
+    let mut results: Vec<(f64, usize, &str)> = unique_books.into_values().collect();
+    let k = top_k.min(results.len());
+    if k == 0 {
+        return vec![];
+    }
+
+    // Partial selection: only the k winners get sorted and copied out. The
+    // rank makes the order total, so unstable selection and sort are exact
+    results.select_nth_unstable_by(k - 1, by_score_then_rank);
+    results.truncate(k);
+    results.sort_unstable_by(by_score_then_rank);
+
+    results
+        .into_iter()
+        .map(|(score, _, book_id)| (score, book_id.to_string()))
+        .collect()
+}
+
+/// Descending score, then ascending first-seen rank.
+fn by_score_then_rank(a: &(f64, usize, &str), b: &(f64, usize, &str)) -> Ordering {
+    b.0.partial_cmp(&a.0)
+        .unwrap_or(Ordering::Equal)
+        .then(a.1.cmp(&b.1))
+}
+
+/// Whether `token` occurs in `key` as a whole space-separated word.
+/// Normalized keys use single spaces, so this equals a token-set lookup.
+fn contains_token(key: &str, token: &str) -> bool {
+    let bytes = key.as_bytes();
+    key.match_indices(token).any(|(start, _)| {
+        let end = start + token.len();
+        (start == 0 || bytes[start - 1] == b' ') && (end == bytes.len() || bytes[end] == b' ')
+    })
+}
+
+/// Keeps alphanumerics and collapses whitespace runs into single spaces,
+/// dropping punctuation without splitting words.
+fn normalize_key(lowered: &str) -> String {
+    let mut out = String::with_capacity(lowered.len());
+    let mut pending_space = false;
+
+    for c in lowered.chars() {
+        if c.is_alphanumeric() {
+            if pending_space && !out.is_empty() {
+                out.push(' ');
+            }
+            pending_space = false;
+            out.push(c);
+        } else if c.is_whitespace() {
+            pending_space = true;
+        }
+    }
+
+    out
+}
@@ -1,7 +1,8 @@
-use crate::analysis::analyze;
-use crate::index::reader::SegmentReader;
+use crate::analysis::{analyze, stopword_set};
+use crate::index::reader::{BlockMax, SegmentReader};
 use crate::index::segment::IndexMeta;
 use pyo3::prelude::*;
+use rayon::prelude::*;
 use rustc_hash::{FxHashMap, FxHashSet};
 use std::cmp::Ordering;
 use std::fs;
@@ -13,6 +14,9 @@ const B: f32 = 0.75;
 #[pyclass]
 pub struct FileSearcher {
     segments: Vec<SegmentReader>,
+    /// Per segment, `k1 * (1 - b + b * dl / avgdl)` for every local doc,
+    /// computed once at load so scoring never touches doc_lengths.bin.
+    length_norms: Vec<Vec<f32>>,
     total_docs: u32,
     avgdl: f32,
     stopwords: FxHashSet<String>,
@@ -39,16 +43,31 @@ impl FileSearcher {
             })
             .collect::<PyResult<Vec<_>>>()?;
 
+        let length_norms = segments
+            .iter()
+            .map(|segment| length_norms(segment, meta.avgdl))
+            .collect();
+
         Ok(Self {
             segments,
+            length_norms,
             total_docs: meta.total_docs,
             avgdl: meta.avgdl,
             stopwords: FxHashSet::default(),
         })
     }
 
-    fn set_stopwords(&mut self, words: Vec<String>) {
-        self.stopwords = words.into_iter().collect();
+    /// Accepts any iterable of strings (list, set, frozenset) without an intermediate list.
+    fn set_stopwords(&mut self, words: &Bound<'_, PyAny>) -> PyResult<()> {
+        self.stopwords = stopword_set(words)?;
+        Ok(())
+    }
+
+    /// Size of the Rust-side stopword set, so callers can check that
+    /// `set_stopwords` took effect without querying.
+    #[getter]
+    fn num_stopwords(&self) -> usize {
+        self.stopwords.len()
     }
 
     #[getter]
@@ -61,23 +80,26 @@ impl FileSearcher {
         self.avgdl
     }
 
-    pub fn search(&self, query: &str, top_k: usize) -> Vec<(String, f32, u32)> {
-        let tokens: Vec<_> = analyze(query)
-            .into_iter()
-            .filter(|t| !self.stopwords.contains(t))
-            .collect();
-
-        if tokens.is_empty() {
-            return vec![];
-        }
-
-        let mut doc_scores: FxHashMap<u32, f32> = FxHashMap::default();
+    /// Starts paging every segment into memory ahead of the first query;
+    /// see `SegmentReader::prefetch`.
+    fn prefetch(&self, py: Python<'_>) {
+        py.detach(|| self.segments.iter().for_each(SegmentReader::prefetch))
+    }
 
-        for token in tokens {
-            self.score_token(&token, &mut doc_scores);
-        }
+    /// Releases the GIL while scoring so Python threads can search concurrently.
+    #[pyo3(name = "search")]
+    fn py_search(&self, py: Python<'_>, query: &str, top_k: usize) -> Vec<(String, f32, u32)> {
+        py.detach(|| self.search(query, top_k))
+    }
 
-        self.select_top_k(doc_scores, top_k)
+    /// Runs several queries at once on the rayon pool with the GIL released.
+    fn search_batch(
+        &self,
+        py: Python<'_>,
+        queries: Vec<String>,
+        top_k: usize,
+    ) -> Vec<Vec<(String, f32, u32)>> {
+        py.detach(|| queries.par_iter().map(|q| self.search(q, top_k)).collect())
     }
 
     fn get_book_id(&self, chunk_id: u32) -> Option<String> {
@@ -86,22 +108,86 @@ impl FileSearcher {
 }
 
 impl FileSearcher {
-    fn score_token(&self, token: &str, doc_scores: &mut FxHashMap<u32, f32>) {
-        let (search_tokens, total_df) = self.resolve_term(token);
+    pub fn search(&self, query: &str, top_k: usize) -> Vec<(String, f32, u32)> {
+        self.top_docs(query, top_k)
+            .into_iter()
+            .filter_map(|(doc_id, score)| {
+                let book_id = self.get_book_id(doc_id)?;
+                Some((book_id, score, doc_id))
+            })
+            .collect()
+    }
 
-        if total_df == 0 {
-            return;
-        }
+    /// Adds the BM25 contribution of `terms` (one query token, possibly
+    /// fuzzy-expanded) to `doc_scores`. With `prune == None` every posting is
+    /// scored and new docs are admitted; otherwise only docs already in the
+    /// map are updated, and blocks that cannot change the top-k are skipped.
+    fn score_terms(
+        &self,
+        terms: &[String],
+        idf: f32,
+        prune: Option<&Pruning>,
+        doc_scores: &mut FxHashMap<u32, f32>,
+    ) {
+        // Postings are decoded into SoA buffers first so the BM25 arithmetic
+        // runs as one branch-free loop that LLVM can vectorize.
+        let mut doc_ids: Vec<u32> = Vec::new();
+        let mut tfs: Vec<f32> = Vec::new();
+        let mut norms: Vec<f32> = Vec::new();
+        let mut scores: Vec<f32> = Vec::new();
+        let default_norm = length_norm(1, self.avgdl);
+
+        for term in terms {
+            for (segment, segment_norms) in self.segments.iter().zip(&self.length_norms) {
+                if let Some(mut iter) = segment.get_postings_iter(term) {
+                    doc_ids.clear();
+                    tfs.clear();
+                    norms.clear();
+                    let block_maxes = match prune {
+                        Some(_) => segment.get_block_maxes(term),
+                        None => vec![],
+                    };
+                    let mut blocks = block_maxes.iter();
+                    // Candidates below the segment's first doc belong to earlier segments
+                    let mut prev_last_doc = segment.base_doc_id.checked_sub(1);
+
+                    while iter.remaining() > 0 {
+                        let mut take = iter.remaining();
+                        if iter.at_block_start() {
+                            if let (Some(prune), Some(block)) = (prune, blocks.next()) {
+                                if prune.can_skip(prev_last_doc, block, idf, self.avgdl, doc_scores) {
+                                    iter.skip_block(block.last_doc);
+                                    prev_last_doc = Some(block.last_doc);
+                                    continue;
+                                }
+                                prev_last_doc = Some(block.last_doc);
+                                take = take.min(BLOCK_LEN);
+                            }
+                        }
+
+                        for (doc_id, tf) in iter.by_ref().take(take) {
+                            doc_ids.push(doc_id);
+                            tfs.push(tf as f32);
+                            norms.push(
+                                doc_id
+                                    .checked_sub(segment.base_doc_id)
+                                    .and_then(|local| segment_norms.get(local as usize))
+                                    .copied()
+                                    .unwrap_or(default_norm),
+                            );
+                        }
+                    }
 
-        let idf = self.compute_idf(total_df);
+                    scores.clear();
+                    scores.resize(doc_ids.len(), 0.0);
+                    bm25_kernel(&tfs, &norms, idf, &mut scores);
 
-        for term in search_tokens {
-            for segment in &self.segments {
-                if let Some(iter) = segment.get_postings_iter(&term) {
-                    for (doc_id, tf) in iter {
-                        let doc_len = segment.get_doc_length(doc_id).unwrap_or(1) as f32;
-                        let score = self.bm25_score(tf as f32, doc_len, idf);
-                        *doc_scores.entry(doc_id).or_insert(0.0) += score;
+                    for (&doc_id, &score) in doc_ids.iter().zip(&scores) {
+                        if prune.is_none() {
+                            *doc_scores.entry(doc_id).or_insert(0.0) += score;
+                        } else if let Some(acc) = doc_scores.get_mut(&doc_id) {
+                            *acc += score;
+                        }
                     }
                 }
             }
@@ -152,36 +238,162 @@ impl FileSearcher {
         ((n - df + 0.5) / (df + 0.5) + 1.0).ln()
     }
 
-    fn bm25_score(&self, tf: f32, doc_len: f32, idf: f32) -> f32 {
-        let numerator = tf * (K1 + 1.0);
-        let denominator = tf + K1 * (1.0 - B + B * doc_len / self.avgdl);
-        idf * numerator / denominator
+    fn top_docs(&self, query: &str, top_k: usize) -> Vec<(u32, f32)> {
+        let tokens: Vec<_> = analyze(query)
+            .into_iter()
+            .filter(|t| !self.stopwords.contains(t))
+            .collect();
+
+        if tokens.is_empty() || top_k == 0 {
+            return vec![];
+        }
+
+        // Resolve every token first so terms can be visited by descending
+        // score upper bound (MaxScore ordering, term-at-a-time).
+        let mut terms: Vec<(Vec<String>, f32, f32)> = tokens
+            .iter()
+            .filter_map(|token| {
+                let (search_tokens, total_df) = self.resolve_term(token);
+                if total_df == 0 {
+                    return None;
+                }
+                let idf = self.compute_idf(total_df);
+                // tf / (tf + k) < 1, so each matched variant adds at most idf * (k1 + 1)
+                let upper_bound = idf * (K1 + 1.0) * search_tokens.len() as f32;
+                Some((search_tokens, idf, upper_bound))
+            })
+            .collect();
+        terms.sort_unstable_by(|a, b| b.2.partial_cmp(&a.2).unwrap_or(Ordering::Equal));
+
+        let mut remaining_bound: f32 = terms.iter().map(|t| t.2).sum();
+        let mut doc_scores: FxHashMap<u32, f32> = FxHashMap::default();
+        // Sorted candidate ids, built once the candidate set stops growing
+        let mut candidates: Vec<u32> = Vec::new();
+
+        for (search_tokens, idf, upper_bound) in terms {
+            // A doc first seen now can score at most `remaining_bound`; once that
+            // falls below the current k-th score, later terms only refine
+            // existing candidates. Accumulators only grow, so top-k is exact.
+            let threshold = if doc_scores.len() < top_k {
+                None
+            } else {
+                Some(kth_score(&doc_scores, top_k))
+            };
+            match threshold.filter(|&kth| remaining_bound < kth) {
+                None => self.score_terms(&search_tokens, idf, None, &mut doc_scores),
+                Some(threshold) => {
+                    if candidates.is_empty() {
+                        candidates = doc_scores.keys().copied().collect();
+                        candidates.sort_unstable();
+                    }
+                    let prune = Pruning {
+                        candidates: &candidates,
+                        threshold,
+                        // Everything still to come except this variant's own block
+                        other_bound: remaining_bound - idf * (K1 + 1.0),
+                    };
+                    self.score_terms(&search_tokens, idf, Some(&prune), &mut doc_scores);
+                }
+            }
+            remaining_bound -= upper_bound;
+        }
+
+        select_top_k(doc_scores, top_k)
     }
+}
 
-    fn select_top_k(
+const BLOCK_LEN: usize = 128;
+
+/// Block-max skipping state for a non-essential term (MaxScore phase where
+/// no new docs are admitted).
+struct Pruning<'a> {
+    /// Every doc that can still reach the top-k, sorted by doc id.
+    candidates: &'a [u32],
+    /// Current k-th best score; it only grows, so it is a safe lower bound.
+    threshold: f32,
+    /// Max score still obtainable from terms other than the current block.
+    other_bound: f32,
+}
+
+impl Pruning<'_> {
+    /// A block can be skipped undecoded when none of its candidates could
+    /// reach `threshold` even if it scored the block's maximum here and the
+    /// maximum on every remaining term. Such docs can never enter the top-k,
+    /// so leaving their accumulators short does not change the result.
+    fn can_skip(
         &self,
-        doc_scores: FxHashMap<u32, f32>,
-        top_k: usize,
-    ) -> Vec<(String, f32, u32)> {
-        if doc_scores.is_empty() {
-            return vec![];
+        prev_last_doc: Option<u32>,
+        block: &BlockMax,
+        idf: f32,
+        avgdl: f32,
+        doc_scores: &FxHashMap<u32, f32>,
+    ) -> bool {
+        let start = match prev_last_doc {
+            Some(prev) => self.candidates.partition_point(|&d| d <= prev),
+            None => 0,
+        };
+        let end = self.candidates.partition_point(|&d| d <= block.last_doc);
+        if start >= end {
+            return true;
         }
 
-        let mut results: Vec<_> = doc_scores.into_iter().collect();
-        let k = top_k.min(results.len());
+        let tf = block.max_tf as f32;
+        let block_bound = idf * (K1 + 1.0) * tf / (tf + length_norm(block.min_doc_len, avgdl));
+        let ceiling = self.threshold - self.other_bound - block_bound;
+        self.candidates[start..end]
+            .iter()
+            .all(|doc_id| doc_scores.get(doc_id).is_some_and(|&acc| acc < ceiling))
+    }
+}
 
-        results.select_nth_unstable_by(k - 1, |a, b| {
-            b.1.partial_cmp(&a.1).unwrap_or(Ordering::Equal)
-        });
-        results.truncate(k);
-        results.sort_unstable_by(|a, b| b.1.partial_cmp(&a.1).unwrap_or(Ordering::Equal));
+/// BM25 over SoA inputs: `idf * tf * (k1 + 1) / (tf + norm)`, where `norm`
+/// is the precomputed length normalization from `length_norm`.
+///
+/// `K1` and `B` are compile-time constants and `avgdl` is already folded
+/// into `norm` at load, so the loop body is one multiply, one add and one
+/// divide per posting with nothing left to specialize at runtime.
+#[inline]
+fn bm25_kernel(tfs: &[f32], norms: &[f32], idf: f32, out: &mut [f32]) {
+    let numer_scale = idf * (K1 + 1.0);
+
+    for ((out, &tf), &norm) in out.iter_mut().zip(tfs).zip(norms) {
+        *out = numer_scale * tf / (tf + norm);
+    }
+}
 
-        results
-            .into_iter()
-            .filter_map(|(doc_id, score)| {
-                let book_id = self.segments.iter().find_map(|s| s.get_book_id(doc_id))?;
-                Some((book_id, score, doc_id))
-            })
-            .collect()
+/// `k1 * (1 - b + b * dl / avgdl)`, the query-independent half of the BM25 denominator.
+fn length_norm(doc_len: u32, avgdl: f32) -> f32 {
+    K1 * (1.0 - B + B * doc_len as f32 / avgdl)
+}
+
+fn length_norms(segment: &SegmentReader, avgdl: f32) -> Vec<f32> {
+    (0..segment.num_docs)
+        .map(|local| {
+            let doc_len = segment.get_doc_length(segment.base_doc_id + local).unwrap_or(1);
+            length_norm(doc_len, avgdl)
+        })
+        .collect()
+}
+
+/// Score of the k-th best accumulator (caller ensures `len >= k > 0`).
+fn kth_score(doc_scores: &FxHashMap<u32, f32>, k: usize) -> f32 {
+    let mut scores: Vec<f32> = doc_scores.values().copied().collect();
+    let (_, kth, _) =
+        scores.select_nth_unstable_by(k - 1, |a, b| b.partial_cmp(a).unwrap_or(Ordering::Equal));
+    *kth
+}
+
+fn select_top_k(doc_scores: FxHashMap<u32, f32>, top_k: usize) -> Vec<(u32, f32)> {
+    let mut results: Vec<_> = doc_scores.into_iter().collect();
+    let k = top_k.min(results.len());
+    if k == 0 {
+        return vec![];
     }
+
+    results.select_nth_unstable_by(k - 1, |a, b| {
+        b.1.partial_cmp(&a.1).unwrap_or(Ordering::Equal)
+    });
+    results.truncate(k);
+    results.sort_unstable_by(|a, b| b.1.partial_cmp(&a.1).unwrap_or(Ordering::Equal));
+    results
 }
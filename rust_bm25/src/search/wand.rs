@@ -1,3 +1,4 @@
+use crate::analysis::stopword_set;
 use crate::codecs::decode_postings_internal;
 use pyo3::prelude::*;
 use rustc_hash::{FxHashMap, FxHashSet};
@@ -63,8 +64,9 @@ impl WandSearcher {
         }
     }
 
-    fn set_stopwords(&mut self, words: Vec<String>) {
-        self.stopwords = words.into_iter().collect();
+    fn set_stopwords(&mut self, words: &Bound<'_, PyAny>) -> PyResult<()> {
+        self.stopwords = stopword_set(words)?;
+        Ok(())
     }
 
     fn search(
@@ -16,7 +16,7 @@ from dataclasses import dataclass
 # Ensure src module is in path
 sys.path.append(".")
 
-from rust_bm25 import FileSearcher
+from rust_bm25 import FileSearcher, rank_with_boosts
 from src.db.database import PostgresRepository
 from src.indexer.stopwords import load_stopwords
 
@@ -42,49 +42,20 @@ def analyze_query(
     print(f"{'Rank':<5} | {'Score':<8} | {'Book ID':<8} | {'Author':<20} | {'Title'}")
     print("-" * 80)
 
-    raw_results = searcher.search(query, top_k * 20)
+    # Only the strongest hits are worth a metadata fetch and boosts, so ask
+    # for exactly those; search() also scores with the GIL released
+    raw_results = searcher.search(query, top_k * 4)
     
     # Apply same logic as API: metadata fetch + boost + dedupe
     candidate_ids = {r[0] for r in raw_results}
-    candidates_meta = {}
-    
-    for bid in candidate_ids:
-        meta = db.get_book("gutenberg", bid)
-        if meta:
-            candidates_meta[bid] = meta
-    
-    unique_books = {}
-    query_norm = query.lower()
-    query_tokens = set(query_norm.split())
-    
-    for book_id, base_score, chunk_id in raw_results:
-        meta = candidates_meta.get(book_id)
-        if not meta:
-            continue
-            
-        title = meta.get("title") or "Unknown"
-        author = meta.get("author") or "Unknown"
-        
-        # Aggressive normalization (same as API)
-        title_norm = " ".join("".join(c for c in title.lower() if c.isalnum() or c.isspace()).split())
-        author_norm = " ".join("".join(c for c in author.lower() if c.isalnum() or c.isspace()).split())
-        dedupe_key = (title_norm, author_norm)
-        
-        final_score = base_score
-        
-        # Boost 1: Title Match
-        if query_norm in title.lower():
-            final_score *= 1.5
-            
-        # Boost 2: Author Match
-        author_tokens = set(author_norm.split())
-        if query_tokens & author_tokens:
-            final_score *= 2.0
-             
-        if dedupe_key not in unique_books or final_score > unique_books[dedupe_key][0]:
-            unique_books[dedupe_key] = (final_score, book_id)
-            
-    sorted_unique = sorted(unique_books.values(), key=lambda x: x[0], reverse=True)[:top_k]
+    candidates_meta = db.get_books_bulk("gutenberg", list(candidate_ids))
+
+    # Normalization, boosts and dedupe run in Rust (same logic as API)
+    flat_meta = {
+        book_id: (meta.get("title") or "Unknown", meta.get("author") or "Unknown")
+        for book_id, meta in candidates_meta.items()
+    }
+    sorted_unique = rank_with_boosts(raw_results, flat_meta, query, top_k)
             
     if not sorted_unique:
         print("   (No results found)")
@@ -116,9 +87,8 @@ def main():
     ]
 
     print("🚀 Initializing Search Engine...")
-    stopwords = list(load_stopwords())
     searcher = FileSearcher(args.index_dir)
-    searcher.set_stopwords(stopwords)
+    searcher.set_stopwords(load_stopwords())
     
     print(f"🔌 Connecting to Database (SQLite={args.sqlite})...")
     db = PostgresRepository(use_sqlite=args.sqlite)
@@ -66,25 +66,44 @@ def migrate():
     print("Migration complete")
 
 
+def format_postings_size(total_bytes: int, total_postings: int) -> str:
+    per_posting = total_bytes / total_postings if total_postings else 0.0
+    return f"{total_bytes} bytes, {total_postings} entries, {per_posting:.3f} bytes/posting"
+
+
 def test():
+    tables_list = ['idx_documents', 'idx_terms', 'idx_globals']
     try:
         with psycopg.connect(get_dsn()) as conn:
-            row = conn.execute("SELECT 1 as ok").fetchone()
+            # Queue every query in one pipeline: a single round-trip instead of six
+            with conn.pipeline():
+                ok_cur = conn.execute("SELECT 1 as ok")
+                tables_cur = conn.execute("""
+                    SELECT table_name FROM information_schema.tables 
+                    WHERE table_schema = 'public' AND table_name LIKE 'idx_%'
+                """)
+                counts_cur = conn.execute(
+                    "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table})" for table in tables_list)
+                )
+                globals_cur = conn.execute("SELECT key, value FROM idx_globals")
+            
+            row = ok_cur.fetchone()
             assert row[0] == 1
             
-            tables = conn.execute("""
-                SELECT table_name FROM information_schema.tables 
-                WHERE table_schema = 'public' AND table_name LIKE 'idx_%'
-            """).fetchall()
+            tables = tables_cur.fetchall()
             
             print(f"Connection: OK")
             print(f"Tables: {[t[0] for t in tables]}")
             
-            for table in ['idx_documents', 'idx_terms', 'idx_globals']:
-                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table, count in zip(tables_list, counts_cur.fetchone()):
                 print(f"  {table}: {count} rows")
             
-            globals_data = conn.execute("SELECT key, value FROM idx_globals").fetchall()
+            globals_data = globals_cur.fetchall()
+            # Stats are materialized by the index writers, so no idx_terms scan here
+            stats = dict(globals_data)
+            if "postings_bytes" in stats:
+                print(f"Postings: {format_postings_size(int(stats['postings_bytes']), int(stats['postings_entries']))}")
+            
             if globals_data:
                 print("Globals:")
                 for key, value in globals_data:
@@ -95,6 +114,65 @@ def test():
         sys.exit(1)
 
 
+def remap_doc_ids():
+    """Renumber doc ids so documents with similar metadata (same source/url
+    prefix) are adjacent, then rewrite every posting list to match.
+
+    Clustered ids give smaller d-gaps, which pack into narrower BP128 blocks.
+    """
+    from psycopg.rows import dict_row
+    from rust_bm25 import decode_postings, encode_postings
+    from src.indexer.storage import refresh_postings_stats
+    
+    with psycopg.connect(get_dsn()) as conn:
+        with conn.cursor(row_factory=dict_row) as stats_cur:
+            before = refresh_postings_stats(stats_cur)
+        
+        # Metadata text starts with the source/url, so sorting on it groups
+        # related documents; doc_id breaks ties to keep chunk order stable
+        rows = conn.execute("SELECT doc_id, metadata FROM idx_documents").fetchall()
+        rows.sort(key=lambda row: (row[1] or "", row[0]))
+        permutation = {old_id: new_id for new_id, (old_id, _) in enumerate(rows)}
+        
+        # Move ids out of the way first so the primary key never collides mid-update
+        conn.execute("UPDATE idx_documents SET doc_id = -1 - doc_id")
+        conn.execute("CREATE TEMP TABLE doc_remap (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL) ON COMMIT DROP")
+        with conn.cursor().copy("COPY doc_remap (old_id, new_id) FROM STDIN") as copy:
+            for old_id, new_id in permutation.items():
+                copy.write_row((old_id, new_id))
+        conn.execute("""
+            UPDATE idx_documents d SET doc_id = m.new_id
+            FROM doc_remap m WHERE d.doc_id = -1 - m.old_id
+        """)
+        
+        # Postings whose doc has no idx_documents row (e.g. left behind by an
+        # interrupted delete) have no new id; drop them rather than abort
+        dropped = 0
+        with conn.cursor(name="remap_terms") as terms_cur, conn.cursor() as update_cur:
+            terms_cur.execute("SELECT term, postings FROM idx_terms")
+            while batch := terms_cur.fetchmany(5000):
+                updates = []
+                for term, postings in batch:
+                    decoded = decode_postings(postings)
+                    remapped = [
+                        (new_id, tf) for doc_id, tf in decoded
+                        if (new_id := permutation.get(doc_id)) is not None
+                    ]
+                    dropped += len(decoded) - len(remapped)
+                    updates.append((encode_postings(remapped), len(remapped), term))
+                update_cur.executemany("UPDATE idx_terms SET postings = %s, df = %s WHERE term = %s", updates)
+        
+        with conn.cursor(row_factory=dict_row) as stats_cur:
+            after = refresh_postings_stats(stats_cur)
+        conn.commit()
+    
+    print(f"Remapped {len(permutation)} doc ids")
+    if dropped:
+        print(f"  dropped {dropped} postings with no matching document")
+    print(f"  before: {format_postings_size(before['postings_bytes'], before['postings_entries'])}")
+    print(f"  after:  {format_postings_size(after['postings_bytes'], after['postings_entries'])}")
+
+
 def clear():
     with psycopg.connect(get_dsn()) as conn:
         conn.execute("TRUNCATE idx_documents, idx_terms, idx_globals")
@@ -118,12 +196,13 @@ def drop():
 
 def main():
     parser = argparse.ArgumentParser(description="Database management")
-    parser.add_argument("command", choices=["migrate", "test", "clear", "clear-all", "drop"])
+    parser.add_argument("command", choices=["migrate", "test", "remap", "clear", "clear-all", "drop"])
     args = parser.parse_args()
     
     commands = {
         "migrate": migrate,
         "test": test,
+        "remap": remap_doc_ids,
         "clear": clear,
         "clear-all": clear_all,
         "drop": drop,
@@ -33,6 +33,7 @@ def enrich_books(use_sqlite: bool = False, limit: int | None = None, batch_size:
         from src.enrichment.service import enrich_books_service
         enrich_books_service(db, client, limit, batch_size)
     finally:
+        client.close()
         db.close()
 
 
@@ -40,7 +41,7 @@ def main():
     parser = argparse.ArgumentParser(description="Enrich books with Open Library metadata")
     parser.add_argument("--sqlite", action="store_true", help="Use SQLite database")
     parser.add_argument("--limit", type=int, help="Limit number of books to enrich (for testing)")
-    parser.add_argument("--batch-size", type=int, default=50, help="Batch size for progress reporting")
+    parser.add_argument("--batch-size", type=int, default=50, help="Books looked up concurrently per batch")
     args = parser.parse_args()
     
     enrich_books(
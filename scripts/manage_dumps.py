@@ -1,17 +1,22 @@
 """
 Script to manage Open Library data dumps: download, process, and update.
 """
+import io
 import os
 import sys
 import gzip
 import json
 import logging
 import sqlite3
+import orjson
 import requests
 import shutil
+import zstandard
+import subprocess
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Generator, Dict, Any
+from typing import Generator, Dict, Any, IO, Iterator
 
 # Add project root to path
 sys.path.append(".")
@@ -26,15 +31,64 @@ DUMP_URL_BASE = "https://openlibrary.org/data/ol_dump_works_latest.txt.gz"
 DUMP_DIR = "data/dumps"
 DB_PATH = "data/openlibrary.db"
 CHUNK_SIZE = 1024 * 1024  # 1MB chunks for download
+WORK_PREFIX = b"/type/work\t"
+ZSTD_LEVEL = 19
+ZSTD_WINDOW_LOG = 27  # --long=27: 128MB match window, default decoder limit
 
-def download_dump(force: bool = False) -> str:
+def find_dumps() -> list[Path]:
+    """Local dumps, oldest first; a .zst copy sorts after its .gz original."""
+    files = list(Path(DUMP_DIR).glob("ol_dump_works_*.txt.gz")) + list(Path(DUMP_DIR).glob("ol_dump_works_*.txt.zst"))
+    return sorted(files, key=lambda f: (f.name.split(".")[0], f.suffix == ".zst"))
+
+def recompress_dump(gz_path: str, keep_gz: bool = False) -> str:
+    """
+    Re-encode a downloaded gzip dump as zstd once, so repeated processing
+    decompresses faster. Uses the zstd CLI (all cores) when installed.
+    """
+    zst_path = gz_path[:-len(".gz")] + ".zst"
+    # Written under a name find_dumps ignores and renamed only once complete,
+    # so a failed or interrupted run never leaves a truncated .zst to be picked up
+    tmp_path = zst_path + ".part"
+    logger.info(f"Recompressing {gz_path} to {zst_path}...")
+    
+    try:
+        with open_dump(gz_path) as src:
+            zstd_cli = shutil.which("zstd")
+            if zstd_cli:
+                proc = subprocess.Popen(
+                    [zstd_cli, "-q", "-f", "-T0", f"-{ZSTD_LEVEL}", f"--long={ZSTD_WINDOW_LOG}", "-o", tmp_path],
+                    stdin=subprocess.PIPE,
+                )
+                try:
+                    shutil.copyfileobj(src, proc.stdin, CHUNK_SIZE)
+                finally:
+                    proc.stdin.close()
+                if proc.wait() != 0:
+                    raise RuntimeError(f"zstd exited with status {proc.returncode}")
+            else:
+                params = zstandard.ZstdCompressionParameters.from_level(
+                    ZSTD_LEVEL, window_log=ZSTD_WINDOW_LOG, enable_ldm=True, threads=-1
+                )
+                cctx = zstandard.ZstdCompressor(compression_params=params)
+                with open(tmp_path, 'wb') as dst:
+                    cctx.copy_stream(src, dst, read_size=CHUNK_SIZE)
+        os.replace(tmp_path, zst_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    
+    if not keep_gz:
+        os.remove(gz_path)
+    return zst_path
+
+def download_dump(force: bool = False, keep_gz: bool = False) -> str:
     """Download the latest Works dump if not already present."""
     Path(DUMP_DIR).mkdir(parents=True, exist_ok=True)
     
     # Check for existing dump file
-    files = list(Path(DUMP_DIR).glob("ol_dump_works_*.txt.gz"))
+    files = find_dumps()
     if files and not force:
-        latest_dump = sorted(files)[-1]
+        latest_dump = files[-1]
         logger.info(f"Using existing dump: {latest_dump}")
         return str(latest_dump)
     
@@ -55,12 +109,44 @@ def download_dump(force: bool = False) -> str:
                 for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
                     f.write(chunk)
         logger.info("Download complete")
-        return output_path
     except Exception as e:
         logger.error(f"Download failed: {e}")
         if os.path.exists(output_path):
             os.remove(output_path)
         raise
+    
+    return recompress_dump(output_path, keep_gz=keep_gz)
+
+@contextmanager
+def open_dump(dump_path: str) -> Iterator[IO[bytes]]:
+    """
+    Binary line stream over a .gz or .zst dump; uses pigz/zstd in a
+    subprocess when installed.
+    """
+    is_zstd = dump_path.endswith(".zst")
+    tool = shutil.which("zstd" if is_zstd else "pigz")
+    if not tool:
+        if is_zstd:
+            with open(dump_path, 'rb') as fh:
+                reader = zstandard.ZstdDecompressor(max_window_size=1 << ZSTD_WINDOW_LOG).stream_reader(fh)
+                yield io.BufferedReader(reader, buffer_size=CHUNK_SIZE)
+        else:
+            with gzip.open(dump_path, 'rb') as f:
+                yield f
+        return
+    
+    # Decompression runs in another process, overlapping with parsing here
+    cmd = [tool, "-dc", dump_path]
+    if is_zstd:
+        cmd.insert(2, f"--long={ZSTD_WINDOW_LOG}")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=CHUNK_SIZE)
+    try:
+        yield proc.stdout
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise RuntimeError(f"{Path(tool).name} exited with status {returncode}")
 
 def process_dump(dump_path: str):
     """Process the dump file and populate the SQLite database."""
@@ -68,32 +154,59 @@ def process_dump(dump_path: str):
     
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    cursor.execute("PRAGMA synchronous = OFF")
     cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    cursor.execute("PRAGMA cache_size = -262144")  # 256MB page cache
+    cursor.execute("PRAGMA mmap_size = 30000000000")
+    cursor.execute("PRAGMA locking_mode = EXCLUSIVE")
+    
+    # Rows land in an unindexed staging table first and are merged into works
+    # in key order at the end, instead of upserting into the primary key index
+    # in dump order
+    cursor.execute("DROP TABLE IF EXISTS works_staging")
+    cursor.execute("""
+    CREATE TABLE works_staging (
+        key TEXT,
+        title TEXT,
+        authors TEXT,
+        ratings_average REAL,
+        ratings_count INTEGER,
+        want_to_read_count INTEGER,
+        edition_count INTEGER,
+        subjects TEXT
+    )
+    """)
     
     logger.info(f"Processing dump file: {dump_path}")
     
     count = 0
     batch = []
     batch_size = 10000
+    commit_every = 1_000_000
+    insert_staging = """
+    INSERT INTO works_staging 
+    (key, title, authors, ratings_average, ratings_count, want_to_read_count, edition_count, subjects)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
     
     try:
-        with gzip.open(dump_path, 'rt', encoding='utf-8') as f:
+        with open_dump(dump_path) as f:
             for line in f:
+                # We only care about works; other lines are skipped without decoding
+                if not line.startswith(WORK_PREFIX):
+                    continue
+                    
                 try:
                     # Format: type \t key \t revision \t last_modified \t JSON
-                    parts = line.split('\t')
+                    parts = line.split(b'\t', 4)
                     if len(parts) < 5:
                         continue
                         
-                    # We only care about works
-                    if parts[0] != '/type/work':
-                        continue
-                        
-                    data = json.loads(parts[4])
+                    data = orjson.loads(parts[4])
                     
                     # Extract relevant fields
-                    key = parts[1].split('/')[-1] # Remove /works/ prefix if present
+                    key = parts[1].decode('utf-8').split('/')[-1] # Remove /works/ prefix if present
                     title = data.get('title', '')
                     
                     # Authors
@@ -124,13 +237,11 @@ def process_dump(dump_path: str):
                     count += 1
                     
                     if len(batch) >= batch_size:
-                        cursor.executemany("""
-                        INSERT OR REPLACE INTO works 
-                        (key, title, authors, ratings_average, ratings_count, want_to_read_count, edition_count, subjects)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """, batch)
-                        conn.commit()
+                        cursor.executemany(insert_staging, batch)
                         batch = []
+                        # Commit rarely to keep the WAL bounded without a flush per batch
+                        if count % commit_every == 0:
+                            conn.commit()
                         if count % 100000 == 0:
                             logger.info(f"Processed {count} records...")
                             
@@ -139,12 +250,33 @@ def process_dump(dump_path: str):
                     
         # Final batch
         if batch:
-            cursor.executemany("""
-            INSERT OR REPLACE INTO works 
-            (key, title, authors, ratings_average, ratings_count, want_to_read_count, edition_count, subjects)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, batch)
-            conn.commit()
+            cursor.executemany(insert_staging, batch)
+        
+        logger.info("Merging staged records into works...")
+        # "WHERE true" disambiguates the upsert clause from a join constraint
+        cursor.execute("""
+        INSERT INTO works 
+        (key, title, authors, ratings_average, ratings_count, want_to_read_count, edition_count, subjects)
+        SELECT key, title, authors, ratings_average, ratings_count, want_to_read_count, edition_count, subjects
+        FROM works_staging WHERE true ORDER BY key
+        ON CONFLICT(key) DO UPDATE SET
+            title = excluded.title,
+            authors = excluded.authors,
+            ratings_average = excluded.ratings_average,
+            ratings_count = excluded.ratings_count,
+            want_to_read_count = excluded.want_to_read_count,
+            edition_count = excluded.edition_count,
+            subjects = excluded.subjects,
+            last_updated = CURRENT_TIMESTAMP
+        """)
+        cursor.execute("DROP TABLE works_staging")
+        
+        # works_fts is contentless, so it is rebuilt wholesale rather than
+        # patched row by row
+        logger.info("Rebuilding title index...")
+        cursor.execute("INSERT INTO works_fts(works_fts) VALUES('delete-all')")
+        cursor.execute("INSERT INTO works_fts(rowid, title) SELECT rowid, title FROM works")
+        conn.commit()
             
         logger.info(f"Finished processing {count} records")
         
@@ -156,9 +288,11 @@ def process_dump(dump_path: str):
 
 def clean_old_dumps(keep_latest: int = 1):
     """Remove old dump files to save space."""
-    files = sorted(Path(DUMP_DIR).glob("ol_dump_works_*.txt.gz"))
-    if len(files) > keep_latest:
-        for f in files[:-keep_latest]:
+    files = find_dumps()
+    # Group by dump date so a kept .gz original goes together with its .zst copy
+    dates = sorted({f.name.split(".")[0] for f in files})
+    for f in files:
+        if f.name.split(".")[0] not in dates[-keep_latest:]:
             logger.info(f"Removing old dump: {f}")
             f.unlink()
 
@@ -168,6 +302,7 @@ def main():
     parser.add_argument("--download-only", action="store_true", help="Only download the dump")
     parser.add_argument("--process-only", help="Process a specific dump file")
     parser.add_argument("--force", action="store_true", help="Force new download")
+    parser.add_argument("--keep-gz", action="store_true", help="Keep the original gzip next to the zstd copy")
     
     args = parser.parse_args()
     
@@ -180,7 +315,7 @@ def main():
                 dump_path = None
                 
                 if not should_download:
-                    files = sorted(Path(DUMP_DIR).glob("ol_dump_works_*.txt.gz"))
+                    files = find_dumps()
                     if files:
                         latest_file = files[-1]
                         file_time = datetime.fromtimestamp(latest_file.stat().st_mtime)
@@ -195,7 +330,7 @@ def main():
                         should_download = True
                 
                 if should_download:
-                    dump_path = download_dump(force=True)
+                    dump_path = download_dump(force=True, keep_gz=args.keep_gz)
                 
                 if not args.download_only and dump_path:
                     process_dump(dump_path)
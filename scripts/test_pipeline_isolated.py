@@ -32,11 +32,12 @@ def create_dummy_books(books_dir):
             f.write(content)
 
 def test_pipeline():
-    # Use a local directory for debugging visibility
-    temp_dir = os.path.abspath("test_pipeline_env")
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
-    os.makedirs(temp_dir)
+    # RAM-backed tmpfs where available, so writing and removing the index
+    # never touches the disk
+    temp_dir = tempfile.mkdtemp(
+        prefix="boogle_pipeline_",
+        dir="/dev/shm" if os.path.isdir("/dev/shm") else None,
+    )
     
     try:
         print(f"--- Running Isolated Pipeline Test in {temp_dir} ---")
@@ -50,7 +51,7 @@ def test_pipeline():
         
         # 2. Run Indexing
         print("\n--- Step 1: Batch Indexing (Disk) ---")
-        stopwords = ["the", "is", "a", "that"]
+        stopwords = frozenset({"the", "is", "a", "that"})
         
         # Check analysis
         try:
@@ -63,7 +64,7 @@ def test_pipeline():
             books_dir,
             index_dir,
             chunks_dir,
-            stopwords, # strict list
+            stopwords,
             100, # chunk size
             10,  # overlap
             10   # batch size
@@ -114,9 +115,8 @@ def test_pipeline():
         raise e
     finally:
         # Cleanup
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-            print(f"[Cleanup] Removed {temp_dir}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        print(f"[Cleanup] Removed {temp_dir}")
 
 if __name__ == "__main__":
     test_pipeline()
@@ -1,41 +1,161 @@
 import os
+import math
+import time
+import threading
+import asyncio
+import logging
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from contextlib import asynccontextmanager
-from collections import defaultdict
+from dataclasses import dataclass
+from collections import OrderedDict
 
-from rust_bm25 import FileSearcher, RealTimeIndexer
+from rust_bm25 import FileSearcher, RealTimeIndexer, rank_with_boosts
 from src.db.database import PostgresRepository
+from src.db.models import normalize_key
 from src.indexer.stopwords import load_stopwords
 
+logger = logging.getLogger(__name__)
+
 
 searcher: FileSearcher | None = None
 realtime_indexer: RealTimeIndexer | None = None
 database: PostgresRepository | None = None
 use_realtime: bool = False
+# Searches run here so the Rust searcher and DB calls don't block the event loop
+search_pool: ThreadPoolExecutor | None = None
+
+# Result cache for /search keyed by (normalized query, limit, index_version).
+# Handlers run on the event loop, so plain dict operations need no lock.
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+search_cache: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+# Bumped whenever the realtime index changes so stale entries stop matching
+index_version: int = 0
+
+# Per-process book metadata cache in the repository. Writes made by this
+# process invalidate entries; the TTL bounds staleness for other writers.
+BOOK_CACHE_SIZE = int(os.getenv("BOOK_CACHE_SIZE", "100000"))
+BOOK_CACHE_TTL = float(os.getenv("BOOK_CACHE_TTL", "900"))
+
+# Per-worker DB pool. Every uvicorn worker (WEB_CONCURRENCY) builds its own,
+# so workers * (size + overflow) must stay under Postgres max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+
+# Candidates enriched and scored per step of /search/stream
+STREAM_BATCH_SIZE = 16
+
+# Startup warm-up: pooled DB connections to open and popular books to preload
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", str(DB_POOL_SIZE)))
+WARMUP_BOOKS = int(os.getenv("WARMUP_BOOKS", "1000"))
+
+
+class _SearchStats:
+    """
+    Adaptive raw-hit budget for /search, as a multiple of `limit`. The factor
+    is an EWMA that moves toward MAX_OVERSAMPLE whenever a page comes up short
+    after dedupe, and back toward MIN_OVERSAMPLE when a page has books to spare.
+    Updated from the search pool threads, hence the lock.
+    """
+    MIN_OVERSAMPLE = 3
+    MAX_OVERSAMPLE = 20
+    ALPHA = 0.2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factor = float(self.MIN_OVERSAMPLE)
+
+    @property
+    def oversample(self) -> int:
+        return math.ceil(self._factor)
+
+    def record(self, short: bool) -> None:
+        target = self.MAX_OVERSAMPLE if short else self.MIN_OVERSAMPLE
+        with self._lock:
+            self._factor += self.ALPHA * (target - self._factor)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._factor = float(self.MIN_OVERSAMPLE)
+
+
+search_stats = _SearchStats()
+
+
+def _cache_get(key: tuple) -> list | None:
+    entry = search_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, results = entry
+    if expires_at < time.monotonic():
+        del search_cache[key]
+        return None
+    search_cache.move_to_end(key)
+    return results
+
+
+def _cache_put(key: tuple, results: list) -> None:
+    search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, results)
+    search_cache.move_to_end(key)
+    while len(search_cache) > SEARCH_CACHE_SIZE:
+        search_cache.popitem(last=False)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global searcher, realtime_indexer, database, use_realtime
+    global searcher, realtime_indexer, database, use_realtime, search_pool
     index_dir = os.getenv("INDEX_DIR", "data/index")
     use_sqlite = os.getenv("USE_SQLITE", "0") == "1"
     use_realtime = os.getenv("REALTIME_INDEX", "0") == "1"
-    stopwords = list(load_stopwords())
     
     if use_realtime:
         realtime_indexer = RealTimeIndexer(index_dir)
     else:
         searcher = FileSearcher(index_dir)
-        searcher.set_stopwords(stopwords)
+        searcher.set_stopwords(load_stopwords())
     
-    database = PostgresRepository(use_sqlite=use_sqlite)
+    database = PostgresRepository(
+        use_sqlite=use_sqlite,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        book_cache_size=BOOK_CACHE_SIZE,
+        book_cache_ttl=BOOK_CACHE_TTL,
+    )
+    search_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="search")
+    await asyncio.to_thread(_warm_up)
     yield
+    search_pool.shutdown(wait=True)
+    search_pool = None
+
 
+def _warm_up() -> None:
+    """
+    Pay index page faults, DB connects and the first book lookups at startup
+    instead of on the first user queries. Best effort: a failure here only
+    means a cold first request, so it is logged rather than raised.
+    """
+    if searcher is not None:
+        searcher.prefetch()
+    try:
+        database.warm_pool(WARMUP_CONNECTIONS)
+        if WARMUP_BOOKS > 0:
+            database.get_books_bulk("gutenberg", database.get_top_book_ids("gutenberg", WARMUP_BOOKS))
+    except Exception:
+        logger.warning("Database warm-up failed", exc_info=True)
 
-app = FastAPI(title="Boogle Search API", version="2.0.0", lifespan=lifespan)
+
+app = FastAPI(
+    title="Boogle Search API",
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -64,7 +184,10 @@ class BookMetadata(BaseModel):
     files: List[dict] = Field(default_factory=list)
 
 
-class SearchResult(BaseModel):
+# Built by the hundreds per request from trusted data, so a slotted dataclass
+# (no pydantic validation, no per-instance __dict__) that orjson encodes natively
+@dataclass(slots=True)
+class SearchResult:
     book_id: str
     title: str
     author: str
@@ -72,6 +195,18 @@ class SearchResult(BaseModel):
     url: str
 
 
+@dataclass(slots=True, frozen=True)
+class QueryContext:
+    """Per-request query forms, derived once and shared by every search step."""
+    norm: str
+    tokens: frozenset[str]
+
+    @classmethod
+    def from_query(cls, query: str) -> "QueryContext":
+        norm = query.lower().strip()
+        return cls(norm=norm, tokens=frozenset(norm.split()))
+
+
 class AddDocumentRequest(BaseModel):
     content: str
     book_id: str
@@ -98,85 +233,97 @@ async def root():
 async def get_metadata(source: str, book_id: str):
     if database is None:
         raise HTTPException(status_code=500, detail="Database not initialized")
-    cached_metadata = database.get_book(source, book_id)
+    # A cache miss is a blocking DB round-trip, so keep it off the event loop
+    loop = asyncio.get_running_loop()
+    cached_metadata = await loop.run_in_executor(search_pool, database.get_book, source, book_id)
     if cached_metadata:
         return cached_metadata
     raise HTTPException(status_code=404, detail="Book not found")
 
 
 @app.get("/search", response_model=List[SearchResult])
-async def search_books(query: str, limit: int = 10):
+async def search_books(query: str, limit: int = 10, use_cache: bool = True):
     if database is None:
         raise HTTPException(status_code=500, detail="Database not initialized")
     
-    if use_realtime:
-        if realtime_indexer is None:
-            raise HTTPException(status_code=500, detail="Realtime indexer not initialized")
-        raw_results = realtime_indexer.search(query, limit * 20)
-    else:
-        if searcher is None:
-            raise HTTPException(status_code=500, detail="Search not initialized")
-        raw_results = searcher.search(query, limit * 20)
+    ctx = QueryContext.from_query(query)
+    # The cache is only touched here, on the event loop thread
+    cache_key = (ctx.norm, limit, index_version)
+    if use_cache:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return ORJSONResponse(cached)
     
-    candidate_ids = {r[0] for r in raw_results}
-    candidates_meta = {}
+    # Falls back to the loop's default executor when lifespan hasn't run
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(search_pool, _do_search, ctx, limit)
     
-    for bid in candidate_ids:
-        meta = database.get_book("gutenberg", bid)
-        if meta:
-            candidates_meta[bid] = meta
-            
-    unique_books: dict[tuple[str, str], tuple[float, str]] = {}
+    # A bypassed lookup must not overwrite what cached callers are served
+    if use_cache:
+        _cache_put(cache_key, results)
+    # Returning the response directly skips response_model re-validation;
+    # response_model still documents the schema
+    return ORJSONResponse(results)
+
+
+def _do_search(ctx: QueryContext, limit: int) -> List[SearchResult]:
+    """Score, enrich and dedupe candidates; blocking, so runs on search_pool."""
+    if not ctx.tokens:
+        return []
+    # Both metadata fetches (first pass and any retry) share one connection
+    with database.request_scope():
+        return _search_pages(ctx, limit)
+
+
+def _search_pages(ctx: QueryContext, limit: int) -> List[SearchResult]:
+    oversample = search_stats.oversample
+    raw_results = _raw_search(ctx.norm, limit * oversample)
+    # Ranking two pages' worth shows whether the hit budget had room to spare
+    results = _rank_candidates(raw_results, ctx, limit * 2)
     
-    query_norm = query.lower()
-    query_tokens = set(query_norm.split())
+    # A short page only means more hits are needed if the searcher filled the budget
+    if len(results) < limit and len(raw_results) >= limit * oversample:
+        search_stats.record(short=True)
+        if oversample < _SearchStats.MAX_OVERSAMPLE:
+            raw_results = _raw_search(ctx.norm, limit * _SearchStats.MAX_OVERSAMPLE)
+            results = _rank_candidates(raw_results, ctx, limit)
+    elif len(results) >= limit * 2:
+        search_stats.record(short=False)
     
-    for book_id, base_score, chunk_id in raw_results:
-        meta = candidates_meta.get(book_id)
-        if not meta:
-            continue
-            
-        title = meta.get("title") or "Unknown"
-        author = meta.get("author") or "Unknown"
-        
-        # Aggressive normalization for deduplication
-        # Remove all punctuation and extra whitespace
-        title_norm = " ".join("".join(c for c in title.lower() if c.isalnum() or c.isspace()).split())
-        author_norm = " ".join("".join(c for c in author.lower() if c.isalnum() or c.isspace()).split())
-        dedupe_key = (title_norm, author_norm)
-        
-        final_score = base_score
-        
-        if query_norm in title.lower():
-            final_score *= 1.5
-            
-        # If any query token appears in author name, assume author search
-        author_tokens = set(author_norm.split())
-        if query_tokens & author_tokens:  # Intersection
-            final_score *= 2.0
-            
-        # Popularity from Open Library (1.0x - 2.0x)
-        ratings_avg = meta.get("ratings_average")
-        ratings_count = meta.get("ratings_count")
-        want_to_read = meta.get("want_to_read_count")
-        edition_count = meta.get("edition_count")
-        
-        if any([ratings_avg, want_to_read, edition_count]):
-            from src.enrichment.openlibrary import EnrichedMetadata
-            enriched = EnrichedMetadata(
-                ratings_average=ratings_avg,
-                ratings_count=ratings_count,
-                want_to_read_count=want_to_read,
-                edition_count=edition_count
-            )
-            final_score *= enriched.popularity_score()
-             
-        # Keep best version of this book
-        if dedupe_key not in unique_books or final_score > unique_books[dedupe_key][0]:
-            unique_books[dedupe_key] = (final_score, book_id)
+    return results[:limit]
+
+
+def _raw_search(query: str, top_k: int) -> list[tuple[str, float, int]]:
+    """Chunk-level (book_id, score, chunk_id) hits, best first."""
+    if use_realtime:
+        if realtime_indexer is None:
+            raise HTTPException(status_code=500, detail="Realtime indexer not initialized")
+        return realtime_indexer.search(query, top_k)
+    if searcher is None:
+        raise HTTPException(status_code=500, detail="Search not initialized")
+    return searcher.search(query, top_k)
+
+
+def _rank_candidates(
+    raw_results: list, ctx: QueryContext, limit: int, candidates_meta: dict | None = None
+) -> List[SearchResult]:
+    if candidates_meta is None:
+        # One round-trip for every candidate instead of a get_book per id
+        candidate_ids = {r[0] for r in raw_results}
+        candidates_meta = database.get_books_bulk("gutenberg", list(candidate_ids))
             
-    # Sort & Format
-    sorted_unique = sorted(unique_books.values(), key=lambda x: x[0], reverse=True)[:limit]
+    # Boosts, dedupe by normalized (title, author) and top-k run in Rust in one
+    # call; popularity is precomputed at enrichment time
+    flat_meta = {}
+    popularity = {}
+    for book_id, meta in candidates_meta.items():
+        flat_meta[book_id] = _ranking_key(meta)
+        # Unscored and neutral (1.0) books are left out; Rust treats them as 1.0
+        multiplier = meta.get("popularity_score")
+        if multiplier and multiplier != 1.0:
+            popularity[book_id] = multiplier
+    # The same normalized query as the cache key, so a hit returns what a miss would compute
+    sorted_unique = rank_with_boosts(raw_results, flat_meta, ctx.norm, limit, popularity)
     
     results = []
     for score, book_id in sorted_unique:
@@ -192,6 +339,74 @@ async def search_books(query: str, limit: int = 10):
     return results
 
 
+def _ranking_key(meta: dict) -> tuple[str, ...]:
+    """
+    (title_lower, title_norm, author_norm) as stored on the row, so the ranker
+    skips lowercasing and normalizing; rows saved before those columns were
+    backfilled fall back to (title, author) and are normalized in Rust.
+    """
+    title_lower = meta.get("title_lower")
+    title_norm = meta.get("title_norm")
+    author_norm = meta.get("author_norm")
+    if title_lower and title_norm and author_norm:
+        return (title_lower, title_norm, author_norm)
+    return (meta.get("title") or "Unknown", meta.get("author") or "Unknown")
+
+
+def _dedupe_key(meta: dict) -> tuple[str, str]:
+    """Normalized (title, author) as stored on the row, computed for rows without it."""
+    return (
+        meta.get("title_norm") or normalize_key(meta.get("title") or "Unknown"),
+        meta.get("author_norm") or normalize_key(meta.get("author") or "Unknown"),
+    )
+
+
+def _rank_stream_batch(
+    batch: list, ctx: QueryContext
+) -> list[tuple[SearchResult, tuple[str, str]]]:
+    """Ranked results of one /search/stream batch, each with its dedupe key."""
+    candidates_meta = database.get_books_bulk("gutenberg", list({r[0] for r in batch}))
+    ranked = _rank_candidates(batch, ctx, len(batch), candidates_meta)
+    return [(result, _dedupe_key(candidates_meta[result.book_id])) for result in ranked]
+
+
+@app.get("/search/stream")
+async def search_books_stream(query: str, limit: int = 10):
+    """
+    Server-sent events variant of /search for interactive clients. Candidates
+    are enriched and scored STREAM_BATCH_SIZE at a time and each new book is
+    sent as soon as its batch is ranked, so results arrive roughly (not
+    strictly) best-first; clients that need exact order should use /search.
+    """
+    if database is None:
+        raise HTTPException(status_code=500, detail="Database not initialized")
+    
+    ctx = QueryContext.from_query(query)
+    loop = asyncio.get_running_loop()
+    raw_results = await loop.run_in_executor(search_pool, _raw_search, ctx.norm, limit * 20)
+    
+    async def events():
+        seen: set[tuple[str, str]] = set()
+        sent = 0
+        for start in range(0, len(raw_results), STREAM_BATCH_SIZE):
+            batch = raw_results[start:start + STREAM_BATCH_SIZE]
+            ranked = await loop.run_in_executor(search_pool, _rank_stream_batch, batch, ctx)
+            for result, dedupe_key in ranked:
+                # rank_with_boosts dedupes within a batch; this covers books split across batches
+                if dedupe_key in seen:
+                    continue
+                seen.add(dedupe_key)
+                yield b"data: " + orjson.dumps(result) + b"\n\n"
+                sent += 1
+                if sent >= limit:
+                    break
+            if sent >= limit:
+                break
+        yield b"event: end\ndata: {}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "mode": "realtime" if use_realtime else "batch"}
@@ -208,14 +423,17 @@ async def add_document(request: AddDocumentRequest):
     if realtime_indexer is None:
         raise HTTPException(status_code=500, detail="Realtime indexer not initialized")
     
-    import json
-    metadata = json.dumps({
+    # The Rust side takes metadata as a str
+    metadata = orjson.dumps({
         "book_id": request.book_id,
         "title": request.title,
         "author": request.author
-    })
+    }).decode()
     
+    global index_version
     doc_id = realtime_indexer.add_document(request.content, metadata)
+    index_version += 1
+    search_stats.reset()
     
     return AddDocumentResponse(
         doc_id=doc_id,
@@ -234,7 +452,10 @@ async def flush_documents():
     if realtime_indexer is None:
         raise HTTPException(status_code=500, detail="Realtime indexer not initialized")
     
+    global index_version
     count = realtime_indexer.flush()
+    index_version += 1
+    search_stats.reset()
     
     return FlushResponse(
         flushed_count=count,
@@ -1,23 +1,58 @@
 import os
+import time
 import logging
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Iterator
-from contextlib import contextmanager
-from sqlalchemy import create_engine, select, text, func, inspect
-from sqlalchemy.orm import sessionmaker, Session, scoped_session
+from contextlib import contextmanager, ExitStack
+
+import orjson
+from sqlalchemy import create_engine, event, select, text, func, inspect, bindparam, literal_column, String
+from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 
-from src.db.models import Base, Book, SeedOffset
+from src.db.models import Base, Book, SeedOffset, BOOK_DICT_COLUMNS, book_row_to_dict, normalize_key
 
 logger = logging.getLogger(__name__)
 
+
+def _json_dumps(obj: Any) -> str:
+    """JSON column serializer (the `files` list): orjson instead of the stdlib encoder."""
+    return orjson.dumps(obj).decode()
+
+
+def _configure_sqlite(dbapi_conn, _record) -> None:
+    """
+    Per-connection SQLite settings, applied once when the pool opens a
+    connection (pooled connections are reused, not reopened per query).
+    WAL lets readers run alongside the writer; synchronous=NORMAL is safe
+    under WAL and skips an fsync per commit.
+    """
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    cursor.close()
+
+
 class DatabaseManager:
     """
     SQLAlchemy-based database manager replacing the old manual SQL repository.
     Handles connection lifecycle, sessions, and repository methods.
     """
     
-    def __init__(self, dsn: Optional[str] = None, use_sqlite: bool = False):
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        use_sqlite: bool = False,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        book_cache_size: int = 50_000,
+        book_cache_ttl: float = 300.0,
+    ):
         self.use_sqlite = use_sqlite or os.getenv("USE_SQLITE", "0") == "1"
         self.url = self._get_db_url(dsn)
         
@@ -29,13 +64,30 @@ class DatabaseManager:
         self.engine = create_engine(
             self.url, 
             connect_args=connect_args,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
             pool_pre_ping=True,
+            json_serializer=_json_dumps,
+            json_deserializer=orjson.loads,
             # echo=True  # Uncomment for debugging SQL
         )
+        if self.use_sqlite:
+            event.listen(self.engine, "connect", _configure_sqlite)
+        
+        # Sessions only back the write paths (reads go through _read). Each
+        # get_session call opens its own, so no thread-local registry; objects
+        # are not re-selected after commit and nothing flushes before queries
+        self.session_factory = sessionmaker(bind=self.engine, expire_on_commit=False, autoflush=False)
         
-        # Thread-safe session factory
-        self.session_factory = sessionmaker(bind=self.engine)
-        self.Session = scoped_session(self.session_factory)
+        # Process-local LRU of book dicts keyed by (source, book_id). Writes made
+        # through this manager invalidate their entry; the TTL bounds staleness
+        # for writes made elsewhere (e.g. an enrichment run in another process).
+        self.book_cache_size = book_cache_size
+        self.book_cache_ttl = book_cache_ttl
+        self._book_cache: OrderedDict[tuple[str, str], tuple[float, Dict]] = OrderedDict()
+        self._book_cache_lock = threading.RLock()
+        # Connection bound by request_scope, per thread
+        self._local = threading.local()
         
         # Ensure tables exist (if not using Alembic externally, but strict use suggests Alembic)
         # We assume Alembic has run. If not, auto-create? 
@@ -72,7 +124,7 @@ class DatabaseManager:
     @contextmanager
     def get_session(self) -> Iterator[Session]:
         """Provide a transactional scope around a series of operations."""
-        session = self.Session()
+        session = self.session_factory()
         try:
             yield session
             session.commit()
@@ -85,15 +137,89 @@ class DatabaseManager:
     def close(self):
         self.engine.dispose()
 
-    # --- Repository Methods (Compatibility API) ---
+    def warm_pool(self, connections: int) -> None:
+        """Open `connections` pooled connections up front, all at once so each is a new one."""
+        with ExitStack() as stack:
+            for _ in range(connections):
+                stack.enter_context(self.engine.connect())
 
-    def upsert_book(self, metadata: Dict) -> None:
+    @contextmanager
+    def request_scope(self) -> Iterator[None]:
         """
-        Insert or Update a book record. 
-        Match on (source, book_id).
+        Serve this thread's book reads from one pooled connection until the
+        block exits, instead of checking one out per call. The connection is
+        taken on the first read that misses the book cache (so fully cached
+        requests never touch the pool) and runs in autocommit mode, so the
+        reads cost no BEGIN/ROLLBACK round-trips. Nested scopes reuse the
+        outer one.
         """
-        source = metadata.get("source")
-        book_id = str(metadata.get("book_id"))
+        if getattr(self._local, "scoped", False):
+            yield
+            return
+        self._local.scoped = True
+        try:
+            yield
+        finally:
+            conn = getattr(self._local, "conn", None)
+            self._local.scoped = False
+            self._local.conn = None
+            if conn is not None:
+                conn.close()
+
+    def _read(self, stmt) -> list:
+        """Rows of a read-only statement, on the request_scope connection if any."""
+        if not getattr(self._local, "scoped", False):
+            with self.engine.connect() as conn:
+                return conn.execute(stmt).all()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            self._local.conn = conn
+        return conn.execute(stmt).all()
+
+    # --- Book cache ---
+
+    def _cached_book(self, key: tuple[str, str]) -> Optional[Dict]:
+        with self._book_cache_lock:
+            entry = self._book_cache.get(key)
+            if entry is None:
+                return None
+            expires_at, book = entry
+            if expires_at < time.monotonic():
+                del self._book_cache[key]
+                return None
+            self._book_cache.move_to_end(key)
+            # A copy, so callers can't edit what later hits are served
+            return dict(book)
+
+    def _cache_books(self, source: str, books: Dict[str, Dict]) -> None:
+        if self.book_cache_size <= 0:
+            return
+        expires_at = time.monotonic() + self.book_cache_ttl
+        with self._book_cache_lock:
+            for book_id, book in books.items():
+                self._book_cache[(source, book_id)] = (expires_at, dict(book))
+                self._book_cache.move_to_end((source, book_id))
+            while len(self._book_cache) > self.book_cache_size:
+                self._book_cache.popitem(last=False)
+
+    def invalidate_book(self, source: str, book_id: str) -> None:
+        """Drop a cached book after it was written."""
+        with self._book_cache_lock:
+            self._book_cache.pop((source, str(book_id)), None)
+
+    def clear_book_cache(self) -> None:
+        with self._book_cache_lock:
+            self._book_cache.clear()
+
+    # --- Repository Methods (Compatibility API) ---
+
+    @staticmethod
+    def _book_values(metadata: Dict) -> Dict:
+        """Column values for a books row from scraped metadata."""
+        get = metadata.get  # bound once; called for every field below
+        source = get("source")
+        book_id = str(get("book_id"))
         if not source or not book_id:
             raise ValueError("source and book_id are required")
             
@@ -101,26 +227,35 @@ class DatabaseManager:
         data = {
             "source": source,
             "book_id": book_id,
-            "url": metadata.get("url", ""),
-            "title": metadata.get("title"),
-            "author": metadata.get("author"),
-            "illustrator": metadata.get("illustrator"),
-            "release_date": metadata.get("release_date"),
-            "language": metadata.get("language"),
-            "category": metadata.get("category"),
-            "original_publication": metadata.get("original_publication"),
-            "credits": metadata.get("credits"),
-            "copyright_status": metadata.get("copyright_status"),
-            "downloads": metadata.get("downloads"),
+            "url": get("url", ""),
+            "title": get("title"),
+            "author": get("author"),
+            "illustrator": get("illustrator"),
+            "release_date": get("release_date"),
+            "language": get("language"),
+            "category": get("category"),
+            "original_publication": get("original_publication"),
+            "credits": get("credits"),
+            "copyright_status": get("copyright_status"),
+            "downloads": get("downloads"),
             # 'files' handled by ORM mapping (list -> JSON)
-            "files": metadata.get("files") or [],
+            "files": get("files") or [],
         }
         
         # Fallback cover URL for Gutenberg
-        cover_url = metadata.get("cover_url")
+        cover_url = get("cover_url")
         if not cover_url and source == "gutenberg":
             cover_url = f"https://www.gutenberg.org/cache/epub/{book_id}/pg{book_id}.cover.medium.jpg"
         data["cover_url"] = cover_url
+        return data
+
+    def upsert_book(self, metadata: Dict) -> None:
+        """
+        Insert or Update a book record. 
+        Match on (source, book_id).
+        """
+        data = self._book_values(metadata)
+        source, book_id = data["source"], data["book_id"]
 
         with self.get_session() as session:
             existing = session.execute(
@@ -133,45 +268,128 @@ class DatabaseManager:
             else:
                 new_book = Book(**data)
                 session.add(new_book)
-            
+        
+        self.invalidate_book(source, book_id)
+
+    def upsert_books_bulk(self, rows: List[Dict]) -> int:
+        """
+        upsert_book for many records: one INSERT ... ON CONFLICT (source, book_id)
+        DO UPDATE executed over all rows in a single transaction, instead of a
+        SELECT plus INSERT/UPDATE per book. Later duplicates of a key win.
+        psycopg runs the executemany in pipeline mode, so on Postgres the batch
+        costs about one round-trip rather than one per row.
+        Returns the number of distinct books written.
+        """
+        by_key: Dict[tuple[str, str], Dict] = {}
+        for metadata in rows:
+            data = self._book_values(metadata)
+            # Core inserts skip Book's validators, so derive the keys here
+            title, author = data["title"], data["author"]
+            data["title_norm"] = normalize_key(title) if title else None
+            data["author_norm"] = normalize_key(author) if author else None
+            data["title_lower"] = title.lower() if title else None
+            by_key[(data["source"], data["book_id"])] = data
+        if not by_key:
+            return 0
+
+        insert = sqlite_insert if self.use_sqlite else pg_insert
+        stmt = insert(Book.__table__)
+        updated = next(iter(by_key.values())).keys() - {"source", "book_id"}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["source", "book_id"],
+            set_={**{col: stmt.excluded[col] for col in updated}, "updated_at": func.now()},
+        )
+        with self.get_session() as session:
+            session.connection().execute(stmt, list(by_key.values()))
+
+        with self._book_cache_lock:
+            for key in by_key:
+                self._book_cache.pop(key, None)
+        return len(by_key)
 
     def get_book(self, source: str, book_id: str) -> Optional[Dict]:
         """Fetch a book as a dictionary."""
-        with self.get_session() as session:
-            book = session.execute(
-                select(Book).where(Book.source == source, Book.book_id == str(book_id))
-            ).scalar_one_or_none()
-            
-            if book:
-                d = book.to_dict()
-                return d
+        book_id = str(book_id)
+        cached = self._cached_book((source, book_id))
+        if cached is not None:
+            return cached
+        
+        # Plain columns: the dict is built straight from the row, no ORM object
+        rows = self._read(
+            select(*BOOK_DICT_COLUMNS).where(Book.source == source, Book.book_id == book_id)
+        )
+        if not rows:
             return None
+        d = book_row_to_dict(rows[0])
+        self._cache_books(source, {book_id: d})
+        return d
+
+    def get_books_bulk(self, source: str, book_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch many books in one round-trip, keyed by book_id."""
+        if not book_ids:
+            return {}
+        found: Dict[str, Dict] = {}
+        missing = []
+        for i in book_ids:
+            cached = self._cached_book((source, str(i)))
+            if cached is not None:
+                found[str(i)] = cached
+            else:
+                missing.append(str(i))
+        # Only cache misses go to the database
+        if not missing:
+            return found
+        stmt = select(*BOOK_DICT_COLUMNS).where(Book.source == source)
+        if self.use_sqlite:
+            stmt = stmt.where(Book.book_id.in_(missing))
+        else:
+            # One array parameter: the statement text (and its cached plan) is
+            # the same whatever the batch size, unlike an expanded IN list.
+            # Joined as an unnest() row source, so the planner drives a nested
+            # loop of (source, book_id) index probes rather than hashing the array.
+            ids = func.unnest(
+                bindparam("book_ids", list(dict.fromkeys(missing)), type_=ARRAY(String))
+            ).table_valued("book_id").alias("ids")
+            stmt = stmt.select_from(Book.__table__.join(ids, Book.book_id == ids.c.book_id))
+        rows = self._read(stmt)
+        fetched = {row.book_id: book_row_to_dict(row) for row in rows}
+        self._cache_books(source, fetched)
+        found.update(fetched)
+        return found
+
+    def get_top_book_ids(self, source: str, limit: int) -> List[str]:
+        """Book ids of `source` by descending popularity_score, unscored books last."""
+        stmt = (
+            select(Book.book_id)
+            .where(Book.source == source)
+            .order_by(Book.popularity_score.desc().nulls_last())
+            .limit(limit)
+        )
+        return [row.book_id for row in self._read(stmt)]
 
     def search_books(self, query: str, limit: int = 10, source: Optional[str] = None) -> List[Dict]:
         """Search books by title/author substring."""
         term = f"%{query.lower()}%"
+        # '' inlined rather than bound, so the expressions match the trigram indexes
+        empty = literal_column("''")
         
-        stmt = select(Book).where(
-            (func.lower(func.coalesce(Book.title, '')).like(term)) | 
-            (func.lower(func.coalesce(Book.author, '')).like(term))
+        stmt = select(*BOOK_DICT_COLUMNS).where(
+            (func.lower(func.coalesce(Book.title, empty)).like(term)) | 
+            (func.lower(func.coalesce(Book.author, empty)).like(term))
         ).order_by(Book.title.asc()).limit(limit)
         
         if source:
             stmt = stmt.where(Book.source == source)
             
-        with self.get_session() as session:
-            books = session.execute(stmt).scalars().all()
-            return [b.to_dict() for b in books]
+        return [book_row_to_dict(row) for row in self._read(stmt)]
 
     def get_seed_offset(self, source: str) -> tuple[int, Optional[str]]:
-        with self.get_session() as session:
-            offset_rec = session.execute(
-                select(SeedOffset).where(SeedOffset.source == source)
-            ).scalar_one_or_none()
-            
-            if offset_rec:
-                return offset_rec.position, offset_rec.last_book_id
-            return -1, None
+        rows = self._read(
+            select(SeedOffset.position, SeedOffset.last_book_id).where(SeedOffset.source == source)
+        )
+        if rows:
+            return rows[0].position, rows[0].last_book_id
+        return -1, None
 
     def update_seed_offset(self, source: str, position: int, last_book_id: Optional[str]) -> None:
         with self.get_session() as session:
@@ -2,13 +2,32 @@
 SQLAlchemy Models for Boogle
 """
 
+import re
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Integer, Float, BigInteger, Text, JSON, Index
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy import String, Integer, Float, BigInteger, Text, JSON, Index, literal_column
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, validates
 from sqlalchemy.sql import func
 
 
+# ASCII punctuation/control bytes dropped by normalize_key (whitespace is kept)
+_ASCII_DROP = bytes(i for i in range(0x80) if not (chr(i).isalnum() or chr(i).isspace()))
+# Same set for arbitrary text; "_" is a \w character but not alphanumeric
+_NONALNUM_RE = re.compile(r"[^\w\s]|_")
+
+
+def normalize_key(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace (dedupe key for title/author)."""
+    lowered = text.lower()
+    if lowered.isalnum():
+        # Common single-word case ("Emma", most one-name authors): already a key
+        return lowered
+    if lowered.isascii():
+        # Fast path: one C-level bytes.translate instead of a per-character generator
+        return " ".join(lowered.encode().translate(None, _ASCII_DROP).decode().split())
+    return " ".join(_NONALNUM_RE.sub("", lowered).split())
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -36,11 +55,20 @@ class Book(Base):
     cover_url: Mapped[Optional[str]] = mapped_column(Text)
     files: Mapped[list] = mapped_column(JSON, nullable=False, default=list, server_default='[]')
     
+    # Normalized title/author, maintained on write for search-time dedupe
+    title_norm: Mapped[Optional[str]] = mapped_column(Text)
+    author_norm: Mapped[Optional[str]] = mapped_column(Text)
+    # Lowercased title for the query-in-title boost (punctuation kept)
+    title_lower: Mapped[Optional[str]] = mapped_column(Text)
+    
     # Enrichment metadata from Open Library
     ratings_average: Mapped[Optional[float]] = mapped_column(Float)
     ratings_count: Mapped[Optional[int]] = mapped_column(BigInteger)
     want_to_read_count: Mapped[Optional[int]] = mapped_column(BigInteger)
     edition_count: Mapped[Optional[int]] = mapped_column(Integer)
+    # EnrichedMetadata.popularity_score(), stored at enrichment time so search
+    # only multiplies by it
+    popularity_score: Mapped[Optional[float]] = mapped_column(Float)
     
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
@@ -48,36 +76,59 @@ class Book(Base):
     
     __table_args__ = (
         Index('idx_books_source_book_id', 'source', 'book_id', unique=True),
-        Index('idx_books_author_lower', func.lower(author)),
-        Index('idx_books_title_lower', func.lower(title)),
+        # Trigram GIN indexes serve search_books' '%term%' LIKE filters, which
+        # no btree can; the expressions must match that query exactly. Other
+        # dialects get a plain (unused) expression index.
+        Index(
+            'idx_books_title_trgm',
+            func.lower(func.coalesce(title, literal_column("''"))).label('title_trgm'),
+            postgresql_using='gin',
+            postgresql_ops={'title_trgm': 'gin_trgm_ops'},
+        ),
+        Index(
+            'idx_books_author_trgm',
+            func.lower(func.coalesce(author, literal_column("''"))).label('author_trgm'),
+            postgresql_using='gin',
+            postgresql_ops={'author_trgm': 'gin_trgm_ops'},
+        ),
     )
     
+    @validates('title', 'author')
+    def _sync_norm(self, key: str, value: Optional[str]) -> Optional[str]:
+        setattr(self, f"{key}_norm", normalize_key(value) if value else None)
+        if key == 'title':
+            self.title_lower = value.lower() if value else None
+        return value
+    
     def __repr__(self):
         return f"<Book(id={self.id}, title='{self.title}', author='{self.author}')>"
     
     def to_dict(self) -> dict:
         """Convert to dictionary for API responses"""
-        return {
-            'source': self.source,
-            'book_id': self.book_id,
-            'url': self.url,
-            'title': self.title,
-            'author': self.author,
-            'illustrator': self.illustrator,
-            'release_date': self.release_date,
-            'language': self.language,
-            'category': self.category,
-            'original_publication': self.original_publication,
-            'credits': self.credits,
-            'copyright_status': self.copyright_status,
-            'downloads': self.downloads,
-            'cover_url': self.cover_url,
-            'files': self.files or [],
-            'ratings_average': self.ratings_average,
-            'ratings_count': self.ratings_count,
-            'want_to_read_count': self.want_to_read_count,
-            'edition_count': self.edition_count,
-        }
+        d = {name: getattr(self, name) for name in BOOK_DICT_FIELDS}
+        d['files'] = d['files'] or []
+        return d
+
+
+# Keys of Book.to_dict, in order. Read paths select exactly these columns so
+# rows become dicts without hydrating ORM objects (see book_row_to_dict).
+BOOK_DICT_FIELDS = (
+    'source', 'book_id', 'url', 'title', 'author',
+    'title_norm', 'author_norm', 'title_lower',
+    'illustrator', 'release_date', 'language', 'category',
+    'original_publication', 'credits', 'copyright_status', 'downloads',
+    'cover_url', 'files',
+    'ratings_average', 'ratings_count', 'want_to_read_count', 'edition_count',
+    'popularity_score',
+)
+BOOK_DICT_COLUMNS = tuple(Book.__table__.c[name] for name in BOOK_DICT_FIELDS)
+
+
+def book_row_to_dict(row) -> dict:
+    """Same dict as Book.to_dict, from a Core row selected with BOOK_DICT_COLUMNS."""
+    d = dict(row._mapping)
+    d['files'] = d['files'] or []
+    return d
 
 
 class SeedOffset(Base):
@@ -1,13 +1,15 @@
-import json
+import asyncio
+import os
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Iterator
+from typing import Iterator, TextIO
 
-import requests
+import httpx
+import orjson
 
 from src.db.database import PostgresRepository
-from src.scraper.scraper import GutenbergScraper
+from src.scraper.scraper import HEADERS, GutenbergScraper
 
 _local = threading.local()
 
@@ -20,15 +22,6 @@ FORMAT_PRIORITY = [
 ]
 
 
-def _get_session() -> requests.Session:
-    if not hasattr(_local, "session"):
-        _local.session = requests.Session()
-        _local.session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        })
-    return _local.session
-
-
 def _get_scraper() -> GutenbergScraper:
     if not hasattr(_local, "scraper"):
         _local.scraper = GutenbergScraper()
@@ -42,12 +35,13 @@ def _fetch_metadata(book_id: str) -> dict:
         return {"book_id": book_id, "source": "gutenberg", "url": f"https://www.gutenberg.org/ebooks/{book_id}"}
 
 
-def _download_book(book_id: str, output_dir: Path, log_file: Path, pre_meta: dict | None = None) -> tuple[str, Path | None, dict, str | None]:
-    session = _get_session()
+async def _download_book(
+    client: httpx.AsyncClient, book_id: str, output_dir: Path, log_file: Path, pre_meta: dict | None = None
+) -> tuple[str, Path | None, dict, str | None]:
     base_url = f"https://www.gutenberg.org/ebooks/{book_id}"
     
     # Use pre_meta if available to avoid scraping
-    meta = pre_meta.copy() if pre_meta else _fetch_metadata(book_id)
+    meta = pre_meta.copy() if pre_meta else await asyncio.to_thread(_fetch_metadata, book_id)
     
     for fmt_type, suffix in FORMAT_PRIORITY:
         ext = ".txt" if fmt_type == "txt" else f".{fmt_type}"
@@ -59,25 +53,47 @@ def _download_book(book_id: str, output_dir: Path, log_file: Path, pre_meta: dic
         
         url = f"{base_url}{suffix}"
         try:
-            resp = session.get(url, timeout=30, allow_redirects=True)
+            resp = await client.get(url)
             if resp.status_code == 200 and len(resp.content) > 100:
-                filepath.write_bytes(resp.content)
+                await asyncio.to_thread(filepath.write_bytes, resp.content)
                 meta["format"] = fmt_type
                 return book_id, filepath, meta, fmt_type
-        except requests.RequestException:
+        except httpx.HTTPError:
             continue
     
     # Final check if we really need to scrape for metadata (fallback)
     if not pre_meta:
-        meta = _fetch_metadata(book_id)
+        meta = await asyncio.to_thread(_fetch_metadata, book_id)
 
     log_entry = {"book_id": book_id, "url": base_url, "title": meta.get("title"), "reason": "no_supported_format"}
-    with open(log_file, "a") as f:
-        f.write(json.dumps(log_entry) + "\n")
+    with open(log_file, "ab") as f:
+        f.write(orjson.dumps(log_entry) + b"\n")
     
     return book_id, None, meta, None
 
 
+def _read_checkpoint(path: Path) -> list[str]:
+    """Ids in the append-only checkpoint log, first occurrence order, without duplicates."""
+    if not path.exists():
+        return []
+    return list(dict.fromkeys(line for line in path.read_text().splitlines() if line))
+
+
+def _open_checkpoint(path: Path) -> TextIO:
+    """Open the checkpoint log for appending, one id per line."""
+    # Checkpoints written by older versions were rewritten whole, with no
+    # trailing newline; don't glue the first appended id onto the last one
+    needs_newline = False
+    if path.exists() and path.stat().st_size:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    fh = open(path, "a", buffering=1 << 16)
+    if needs_newline:
+        fh.write("\n")
+    return fh
+
+
 class BookSeeder:
     def __init__(self, output_dir: str = "data/books", max_workers: int = 16, use_sqlite: bool = False):
         self.output_dir = Path(output_dir)
@@ -106,59 +122,66 @@ class BookSeeder:
         return filtered
 
     def seed_all(self, limit: int | None = None, batch_size: int = 500) -> int:
-        checkpoint_file = self.output_dir / ".checkpoint"
+        return asyncio.run(self._seed_all_async(limit=limit, batch_size=batch_size))
 
-        downloaded_ids = set()
-        if checkpoint_file.exists():
-            downloaded_ids = set(checkpoint_file.read_text().splitlines())
+    async def _seed_all_async(self, limit: int | None, batch_size: int) -> int:
+        checkpoint_file = self.output_dir / ".checkpoint"
+        downloaded_ids = set(_read_checkpoint(checkpoint_file))
 
         total = 0
         batch = []
 
-        for meta in self.iter_all_books(limit=limit):
-            book_id = meta['book_id']
-            if book_id in downloaded_ids:
-                continue
-            batch.append(meta)
-
-            if len(batch) >= batch_size:
-                filtered_batch = self._filter_books(batch)
-                results = self._process_batch(filtered_batch)
-                for bid, path, meta_res, fmt in results:
-                    if path:
-                        downloaded_ids.add(bid)
-                        total += 1
-                    self.db.upsert_book(meta_res)
-                
-                skipped_ids = {m['book_id'] for m in batch} - {m['book_id'] for m in filtered_batch}
-                downloaded_ids.update(skipped_ids)
-
-                checkpoint_file.write_text("\n".join(downloaded_ids))
-                print(f"Seeded {total} books (skipped {len(skipped_ids)} super-documents)")
-                batch = []
-
-        if batch:
-            filtered_batch = self._filter_books(batch)
-            results = self._process_batch(filtered_batch)
-            for bid, path, meta_res, fmt in results:
-                if path:
-                    downloaded_ids.add(bid)
-                    total += 1
-                self.db.upsert_book(meta_res)
-            
-            skipped_ids = {m['book_id'] for m in batch} - {m['book_id'] for m in filtered_batch}
-            downloaded_ids.update(skipped_ids)
-            
-            checkpoint_file.write_text("\n".join(downloaded_ids))
+        # One client (and connection pool) spans every batch
+        limits = httpx.Limits(max_connections=self.max_workers, max_keepalive_connections=self.max_workers)
+        with _open_checkpoint(checkpoint_file) as checkpoint:
+            async with httpx.AsyncClient(
+                http2=True, headers=HEADERS, timeout=30, follow_redirects=True, limits=limits
+            ) as client:
+                for meta in self.iter_all_books(limit=limit):
+                    book_id = meta['book_id']
+                    if book_id in downloaded_ids:
+                        continue
+                    batch.append(meta)
+
+                    if len(batch) >= batch_size:
+                        seeded, skipped = await self._seed_batch(client, batch, downloaded_ids, checkpoint)
+                        total += seeded
+                        print(f"Seeded {total} books (skipped {skipped} super-documents)")
+                        batch = []
+
+                if batch:
+                    seeded, _ = await self._seed_batch(client, batch, downloaded_ids, checkpoint)
+                    total += seeded
 
         return total
 
+    async def _seed_batch(
+        self, client: httpx.AsyncClient, batch: list[dict], downloaded_ids: set[str], checkpoint: TextIO
+    ) -> tuple[int, int]:
+        """Download and upsert one batch, then append its finished ids to the checkpoint."""
+        # Filtering and the blocking upsert run off the event loop, so downloads keep flowing
+        filtered_batch = await asyncio.to_thread(self._filter_books, batch)
+        results = await self._process_batch(client, filtered_batch)
+        done = [bid for bid, path, _, _ in results if path]
+        await asyncio.to_thread(self.db.upsert_books_bulk, [meta_res for _, _, meta_res, _ in results])
+
+        skipped_ids = {m['book_id'] for m in batch} - {m['book_id'] for m in filtered_batch}
+        done.extend(skipped_ids)
+        downloaded_ids.update(done)
+
+        # Only this batch's ids are written, so checkpoint cost no longer grows
+        # with the number of books already seeded
+        if done:
+            checkpoint.write("".join(f"{bid}\n" for bid in done))
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        return len(done) - len(skipped_ids), len(skipped_ids)
+
     def update_metadata(self, batch_size: int = 100) -> int:
-        checkpoint_file = self.output_dir / ".checkpoint"
-        if not checkpoint_file.exists():
+        book_ids = _read_checkpoint(self.output_dir / ".checkpoint")
+        if not book_ids:
             return 0
 
-        book_ids = checkpoint_file.read_text().splitlines()
         total = len(book_ids)
         updated = 0
 
@@ -166,30 +189,38 @@ class BookSeeder:
             batch = book_ids[i:i + batch_size]
             with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
                 futures = {executor.submit(_fetch_metadata, bid): bid for bid in batch}
+                fetched = []
                 for future in as_completed(futures):
                     try:
                         meta = future.result()
-                        self.db.upsert_book(meta)
-                        updated += 1
                     except Exception:
-                        pass
+                        continue
+                    # One bad record must not fail the whole batch's upsert
+                    if meta.get("source") and meta.get("book_id"):
+                        fetched.append(meta)
+            updated += self.db.upsert_books_bulk(fetched)
             print(f"Updated {updated}/{total} books")
 
         return updated
 
-    def _process_batch(self, batch_meta: list[dict]) -> list[tuple[str, Path | None, dict, str | None]]:
-        results = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {
-                executor.submit(_download_book, m['book_id'], self.output_dir, self.log_file, m): m
-                for m in batch_meta
-            }
-            for future in as_completed(futures):
-                try:
-                    results.append(future.result())
-                except Exception:
-                    pass
-        return results
+    async def _process_batch(
+        self, client: httpx.AsyncClient, batch_meta: list[dict]
+    ) -> list[tuple[str, Path | None, dict, str | None]]:
+        # HTTP/2 multiplexes streams past the connection limit, so max_workers
+        # caps the downloads in flight here
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def download(meta: dict):
+            async with semaphore:
+                return await _download_book(client, meta['book_id'], self.output_dir, self.log_file, meta)
+
+        results = await asyncio.gather(*(download(m) for m in batch_meta), return_exceptions=True)
+        # A failed download only loses its own book; cancellation and
+        # interrupts still stop the run
+        for r in results:
+            if isinstance(r, BaseException) and not isinstance(r, Exception):
+                raise r
+        return [r for r in results if not isinstance(r, Exception)]
 
 
 # Backward compatibility
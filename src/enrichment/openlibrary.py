@@ -8,12 +8,57 @@ to improve ranking with social signals.
 import sqlite3
 import json
 import logging
+import math
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from dataclasses import dataclass
 
+from src.db.models import normalize_key
+
 logger = logging.getLogger(__name__)
 
+# Title matches fetched from works_fts before picking the closest one, when
+# no work has exactly the normalized title
+FTS_CANDIDATES = 50
+
+_WORK_COLUMNS = "title, ratings_average, ratings_count, want_to_read_count, edition_count, subjects"
+
+
+def _sql_normalize_key(text: Optional[str]) -> Optional[str]:
+    return normalize_key(text) if text is not None else None
+
+
+def popularity_from_fields(
+    ratings_average: Optional[float],
+    ratings_count: Optional[int],
+    want_to_read_count: Optional[int],
+    edition_count: Optional[int],
+) -> float:
+    """
+    Calculate a popularity score from metadata signals.
+    Returns a multiplier between 1.0 and 2.0.
+    """
+    score = 1.0
+    
+    if ratings_average and ratings_count:
+        if ratings_count >= 10:  # Minimum threshold
+            rating_boost = (ratings_average / 5.0) * 0.3
+            score += rating_boost
+    
+    # Want-to-read boost (up to +0.2)
+    if want_to_read_count:
+        # Logarithmic scale: 100 reads = +0.1, 1000 reads = +0.15, 10000+ = +0.2
+        want_boost = min(0.2, math.log10(max(1, want_to_read_count)) / 20)
+        score += want_boost
+    
+    if edition_count:
+        edition_boost = min(0.1, edition_count / 100)
+        score += edition_boost
+        
+    return min(2.0, score)
+
 @dataclass
 class EnrichedMetadata:
     """Metadata from Open Library"""
@@ -24,29 +69,13 @@ class EnrichedMetadata:
     subjects: list[str] = None
     
     def popularity_score(self) -> float:
-        """
-        Calculate a popularity score from metadata signals.
-        Returns a multiplier between 1.0 and 2.0.
-        """
-        score = 1.0
-        
-        if self.ratings_average and self.ratings_count:
-            if self.ratings_count >= 10:  # Minimum threshold
-                rating_boost = (self.ratings_average / 5.0) * 0.3
-                score += rating_boost
-        
-        # Want-to-read boost (up to +0.2)
-        if self.want_to_read_count:
-            # Logarithmic scale: 100 reads = +0.1, 1000 reads = +0.15, 10000+ = +0.2
-            import math
-            want_boost = min(0.2, math.log10(max(1, self.want_to_read_count)) / 20)
-            score += want_boost
-        
-        if self.edition_count:
-            edition_boost = min(0.1, self.edition_count / 100)
-            score += edition_boost
-            
-        return min(2.0, score)
+        """See popularity_from_fields."""
+        return popularity_from_fields(
+            self.ratings_average,
+            self.ratings_count,
+            self.want_to_read_count,
+            self.edition_count,
+        )
 
 
 class OpenLibraryClient:
@@ -55,18 +84,64 @@ class OpenLibraryClient:
     Replaces the API client to avoid rate limits and network latency.
     """
     
-    def __init__(self, db_path: str = "data/openlibrary.db"):
+    def __init__(self, db_path: str = "data/openlibrary.db", max_workers: int = 8):
         self.db_path = db_path
+        self.max_workers = max_workers
+        # One long-lived connection per worker thread instead of one per lookup
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
         
-    def _get_connection(self):
+    def _connect(self) -> sqlite3.Connection:
         if not os.path.exists(self.db_path):
             raise FileNotFoundError(f"Open Library database not found at {self.db_path}. Run 'python3 scripts/manage_dumps.py' first.")
             
+        # check_same_thread=False only so close() can run from any thread;
+        # each connection is still used by the thread that opened it
         try:
-            return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
         except sqlite3.OperationalError:
             # Fallback for standard connection if URI fails
-            return sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # Lets enrich_book compare titles exactly as normalized on our side
+        conn.create_function("normalize_key", 1, _sql_normalize_key, deterministic=True)
+        return conn
+            
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Shut down the lookup pool and close every per-thread connection."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+            
+    def enrich_books(self, books: list[tuple[str, str]]) -> list[Optional[EnrichedMetadata]]:
+        """
+        Look up many (title, author) pairs concurrently, preserving order.
+        sqlite3 releases the GIL while a query runs, so FTS lookups overlap.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="openlibrary")
+        return list(self._executor.map(lambda book: self.enrich_book(*book), books))
             
     def enrich_book(self, title: str, author: str) -> Optional[EnrichedMetadata]:
         """
@@ -79,44 +154,57 @@ class OpenLibraryClient:
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            # Simple FTS query
             # We strip special chars that might break FTS syntax
-            clean_title = "".join(c for c in title if c.isalnum() or c.isspace())
-            clean_author = "".join(c for c in author if c.isalnum() or c.isspace()) if author else ""
+            title_tokens = normalize_key(title).split()
+            if not title_tokens:
+                return None
             
-            query_str = f'"{clean_title}"'
+            # works_fts is detail=none (rowids only): no phrase queries or bm25 rank,
+            # so match every token and pick the closest title among the candidates.
+            # Quoting each token keeps words like AND/OR/NOT from being parsed as operators.
+            query_str = " ".join(f'"{token}"' for token in title_tokens)
             # Author names are not currently in the works dump (only keys), so we can't reliably FTS them yet.
-            # if clean_author and clean_author != "Unknown":
-            #    query_str += f' AND "{clean_author}"'
             
-            # Use FTS to find best match
-            # Order by rank is implicit in FTS, but we can also check for exact title match in results
-            cursor.execute("""
-                SELECT 
-                    ratings_average, 
-                    ratings_count, 
-                    want_to_read_count, 
-                    edition_count, 
-                    subjects 
-                FROM works_fts 
-                JOIN works ON works_fts.rowid = works.rowid
-                WHERE works_fts MATCH ? 
-                ORDER BY rank 
+            # Exact normalized title first, over every FTS match: for short common
+            # titles ("Emma", "Poems") thousands of works match, and any LIMIT
+            # applied in rowid order could miss the right one
+            target = " ".join(title_tokens)
+            cursor.execute(f"""
+                SELECT {_WORK_COLUMNS}
+                FROM works
+                WHERE rowid IN (SELECT rowid FROM works_fts WHERE works_fts MATCH ?)
+                  AND normalize_key(title) = ?
+                ORDER BY edition_count DESC
                 LIMIT 1
-            """, (query_str,))
-            
-            row = cursor.fetchone()
-            conn.close()
+            """, (query_str, target))
+            rows = cursor.fetchall()
+            if not rows:
+                # No exact title: the closest of a bounded sample of matches
+                cursor.execute(f"""
+                    SELECT {_WORK_COLUMNS}
+                    FROM works
+                    WHERE rowid IN (
+                        SELECT rowid FROM works_fts WHERE works_fts MATCH ? LIMIT ?
+                    )
+                """, (query_str, FTS_CANDIDATES))
+                rows = cursor.fetchall()
+            cursor.close()
             
-            if row:
-                subjects_json = row[4]
+            if rows:
+                def closeness(row):
+                    tokens = normalize_key(row[0] or "").split()
+                    # Fewest extra words, then the most-published work
+                    return (len(tokens) - len(title_tokens), -(row[4] or 0))
+                
+                row = min(rows, key=closeness)
+                subjects_json = row[5]
                 subjects = json.loads(subjects_json) if subjects_json else []
                 
                 return EnrichedMetadata(
-                    ratings_average=row[0],
-                    ratings_count=row[1],
-                    want_to_read_count=row[2],
-                    edition_count=row[3],
+                    ratings_average=row[1],
+                    ratings_count=row[2],
+                    want_to_read_count=row[3],
+                    edition_count=row[4],
                     subjects=subjects
                 )
                 
@@ -41,36 +41,25 @@ def init_db(db_path: str = "data/openlibrary.db"):
     );
     """)
     
-    # FTS5 index for fast search by title/author
+    # Earlier schemas mirrored title/authors into an external-content FTS
+    # table kept in sync by triggers; replace it with the contentless one
+    for trigger in ("works_ai", "works_ad", "works_au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    row = cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'works_fts'").fetchone()
+    if row and "detail=none" not in row[0]:
+        cursor.execute("DROP TABLE works_fts")
+    
+    # Contentless FTS5 index over titles for matching. detail=none stores only
+    # rowids (no positions or content), a fraction of the full index size.
+    # process_dump fills it in one pass after loading works.
     cursor.execute("""
     CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5(
         title,
-        authors,
-        content=works,
-        content_rowid=rowid
+        content='',
+        detail=none
     );
     """)
     
-    # Triggers to keep FTS index in sync
-    cursor.execute("""
-    CREATE TRIGGER IF NOT EXISTS works_ai AFTER INSERT ON works BEGIN
-      INSERT INTO works_fts(rowid, title, authors) VALUES (new.rowid, new.title, new.authors);
-    END;
-    """)
-    
-    cursor.execute("""
-    CREATE TRIGGER IF NOT EXISTS works_ad AFTER DELETE ON works BEGIN
-      INSERT INTO works_fts(works_fts, rowid, title, authors) VALUES('delete', old.rowid, old.title, old.authors);
-    END;
-    """)
-    
-    cursor.execute("""
-    CREATE TRIGGER IF NOT EXISTS works_au AFTER UPDATE ON works BEGIN
-      INSERT INTO works_fts(works_fts, rowid, title, authors) VALUES('delete', old.rowid, old.title, old.authors);
-      INSERT INTO works_fts(rowid, title, authors) VALUES (new.rowid, new.title, new.authors);
-    END;
-    """)
-    
     conn.commit()
     conn.close()
     logger.info(f"Initialized Open Library database at {db_path}")
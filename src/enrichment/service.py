@@ -3,13 +3,20 @@ Service module for metadata enrichment.
 """
 import logging
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, update
 from src.db.database import DatabaseManager
 from src.db.models import Book
 from src.enrichment.openlibrary import OpenLibraryClient
 
 logger = logging.getLogger(__name__)
 
+# SET columns come from the parameter dict keys; the key is bound separately
+# because a bindparam may not share its name with a column being updated
+_ENRICH_UPDATE = (
+    update(Book.__table__)
+    .where(Book.__table__.c.source == 'gutenberg', Book.__table__.c.book_id == bindparam('b_book_id'))
+)
+
 def enrich_books_service(
     db_manager: DatabaseManager, 
     ol_client: OpenLibraryClient,
@@ -48,39 +55,45 @@ def enrich_books_service(
     enriched_count = 0
     failed_count = 0
     
-    for i, (book_id, title, author) in enumerate(candidates, 1):
-        if not title:
-            continue
-            
-        if i % batch_size == 0:
-            logger.info(f"Progress: [{i}/{total}]")
+    # Books without a title can't be matched, so they are skipped outright
+    candidates = [c for c in candidates if c.title]
+    
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        logger.info(f"Progress: [{start + len(batch)}/{total}]")
         
-        try:
-            enriched = ol_client.enrich_book(title, author or "Unknown")
-            
+        # Lookups for the whole batch run concurrently on the client's pool
+        results = ol_client.enrich_books([(title, author or "Unknown") for _, title, author in batch])
+        
+        pending_updates = []
+        for (book_id, title, _), enriched in zip(batch, results):
             if enriched:
-                # Update database (new session for short transaction)
-                with db_manager.get_session() as session:
-                    book = session.execute(
-                        select(Book).where(Book.source == 'gutenberg', Book.book_id == str(book_id))
-                    ).scalar_one_or_none()
-                    
-                    if book:
-                        book.ratings_average = enriched.ratings_average
-                        book.ratings_count = enriched.ratings_count
-                        book.want_to_read_count = enriched.want_to_read_count
-                        book.edition_count = enriched.edition_count
-                        # Session commit executes on exit
-                
-                enriched_count += 1
+                pending_updates.append({
+                    "b_book_id": str(book_id),
+                    "ratings_average": enriched.ratings_average,
+                    "ratings_count": enriched.ratings_count,
+                    "want_to_read_count": enriched.want_to_read_count,
+                    "edition_count": enriched.edition_count,
+                    "popularity_score": enriched.popularity_score(),
+                })
                 disp_rating = f"{enriched.ratings_average:.2f}" if enriched.ratings_average else "N/A"
                 logger.debug(f"Enriched '{title}': Rating={disp_rating}, Wanted={enriched.want_to_read_count}")
             else:
                 failed_count += 1
-                
+        
+        if not pending_updates:
+            continue
+        
+        try:
+            # One executemany UPDATE per batch instead of a SELECT + UPDATE per book
+            with db_manager.get_session() as session:
+                session.connection().execute(_ENRICH_UPDATE, pending_updates)
+            for row in pending_updates:
+                db_manager.invalidate_book('gutenberg', row["b_book_id"])
+            enriched_count += len(pending_updates)
         except Exception as e:
-            failed_count += 1
-            logger.error(f"Error enriching '{title}': {e}")
+            failed_count += len(pending_updates)
+            logger.error(f"Error saving enrichment batch at [{start}/{total}]: {e}")
             
     logger.info(f"Enrichment complete. Enriched: {enriched_count}, Failed: {failed_count}")
     return enriched_count, failed_count
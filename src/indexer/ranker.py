@@ -2,6 +2,7 @@
 Google-like ranking without ML.
 BM25 + editorial heuristics using file-based index.
 """
+import heapq
 import json
 import math
 import os
@@ -71,7 +72,7 @@ class Ranker:
     def _get_searcher(self) -> FileSearcher:
         if self._searcher is None:
             self._searcher = FileSearcher(str(self._index_dir))
-            self._searcher.set_stopwords(list(self._stopwords))
+            self._searcher.set_stopwords(self._stopwords)
         return self._searcher
 
     def search(self, query: str, top_k: int = 10) -> list[BookResult]:
@@ -93,7 +94,35 @@ class Ranker:
         book_ids = list(set(book_id for book_id, _, _ in candidates))
         books_meta = self.storage.get_books_metadata(book_ids)
         
+        return self._rank_candidates(query_set, candidates, books_meta, top_k)
+
+    def search_batch(self, queries: list[str], top_k: int = 10) -> list[list[BookResult]]:
+        """Rank several queries with one parallel BM25 pass and one metadata fetch."""
+        searcher = self._get_searcher()
+        all_candidates = searcher.search_batch(queries, top_k * 20)
+        
+        book_ids = list({book_id for candidates in all_candidates for book_id, _, _ in candidates})
+        books_meta = self.storage.get_books_metadata(book_ids)
+        
+        results = []
+        for query, candidates in zip(queries, all_candidates):
+            query_set = {t for t in analyze(query) if t not in self._stopwords}
+            if not query_set or not candidates:
+                results.append([])
+                continue
+            results.append(self._rank_candidates(query_set, candidates, books_meta, top_k))
+        return results
+
+    def _rank_candidates(
+        self,
+        query_set: set[str],
+        candidates: list[tuple[str, float, int]],
+        books_meta: dict[str, dict],
+        top_k: int,
+    ) -> list[BookResult]:
         # 3. Score chunks with boosts
+        # Length penalty (use avgdl as proxy); the same for every chunk
+        length_penalty = math.log(1 + LENGTH_NORM / self._avgdl)
         chunk_results: list[ChunkResult] = []
         for book_id, bm25_score, chunk_id in candidates:
             meta = books_meta.get(book_id, {})
@@ -110,9 +139,6 @@ class Ranker:
             # Phrase boost: if all query terms match title, boost
             phrase_mult = PHRASE_BOOST if title_matches == len(query_set) and len(query_set) > 1 else 1.0
             
-            # Length penalty (use avgdl as proxy)
-            length_penalty = math.log(1 + LENGTH_NORM / self._avgdl)
-            
             score = (bm25_score + TITLE_BOOST * title_score) * coverage_mult * length_penalty * phrase_mult
             
             chunk_results.append(ChunkResult(
@@ -125,19 +151,23 @@ class Ranker:
                 meta=meta
             ))
         
-        # 4. Aggregate chunks by book
-        books: dict[str, list[ChunkResult]] = defaultdict(list)
+        # 4. Aggregate chunks by book; only the two best chunks count, so keep
+        # those with one dict lookup per chunk instead of sorting every list
+        books: dict[str, tuple[ChunkResult, ChunkResult | None]] = {}
         for cr in chunk_results:
-            books[cr.book_id].append(cr)
+            cur = books.get(cr.book_id)
+            if cur is None:
+                books[cr.book_id] = (cr, None)
+            elif cr.score > cur[0].score:
+                books[cr.book_id] = (cr, cur[0])
+            elif cur[1] is None or cr.score > cur[1].score:
+                books[cr.book_id] = (cur[0], cr)
         
         book_results: list[BookResult] = []
-        for book_id, chunks in books.items():
-            chunks.sort(key=lambda x: x.score, reverse=True)
-            best = chunks[0]
-            
+        for book_id, (best, second) in books.items():
             book_score = best.score
-            if len(chunks) > 1:
-                book_score += SUM_TOP_N_WEIGHT * chunks[1].score
+            if second is not None:
+                book_score += SUM_TOP_N_WEIGHT * second.score
             
             # Reference penalty
             title_lower = best.title.lower()
@@ -185,5 +215,5 @@ class Ranker:
                 br.score *= 0.9 ** n
             author_counts[br.author] += 1
         
-        book_results.sort(key=lambda x: x.score, reverse=True)
-        return book_results[:top_k]
+        # Only the top_k survive the re-rank, so select them instead of sorting all
+        return heapq.nlargest(top_k, book_results, key=lambda x: x.score)
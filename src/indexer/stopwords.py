@@ -1,18 +1,13 @@
 import json
+from functools import cache
 from pathlib import Path
 
-_STOPWORDS: frozenset[str] | None = None
-
 
+@cache
 def load_stopwords() -> frozenset[str]:
-    global _STOPWORDS
-    if _STOPWORDS is not None:
-        return _STOPWORDS
-    
     stopwords_file = Path(__file__).parent.parent.parent / "stopwords-iso.json"
     if not stopwords_file.exists():
-        _STOPWORDS = frozenset()
-        return _STOPWORDS
+        return frozenset()
     
     with open(stopwords_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
@@ -22,5 +17,4 @@ def load_stopwords() -> frozenset[str]:
         if lang == 'en':
             all_words.update(w.lower() for w in lang_words)
     
-    _STOPWORDS = frozenset(all_words)
-    return _STOPWORDS
+    return frozenset(all_words)
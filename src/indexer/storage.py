@@ -1,6 +1,9 @@
 import os
 import sqlite3
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
 from functools import lru_cache
 from pathlib import Path
 
@@ -12,15 +15,120 @@ from rust_bm25 import merge_postings
 
 CHUNKS_DIR = Path(os.getenv("CHUNKS_DIR", "data/chunks"))
 CACHE_MAX_BOOKS = int(os.getenv("CACHE_MAX_BOOKS", "500"))  # ~100MB for avg 200KB/book
+CACHE_PINNED_BOOKS = int(os.getenv("CACHE_PINNED_BOOKS", "0"))  # most-downloaded books kept resident
+
+
+class SegmentedLRUCache:
+    """
+    SLRU cache: new entries land in a probationary segment and move to the
+    protected segment (protected_ratio of maxsize) on their second hit, so a
+    burst of one-off lookups cannot flush books that are read repeatedly.
+    Pinned entries sit outside both segments and are never evicted.
+    """
+
+    def __init__(self, loader: Callable, maxsize: int, protected_ratio: float = 0.8):
+        self._loader = loader
+        self.maxsize = maxsize
+        self._protected_max = int(maxsize * protected_ratio)
+        self._probation: OrderedDict = OrderedDict()
+        self._protected: OrderedDict = OrderedDict()
+        self._pinned: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            if key in self._pinned:
+                self.hits += 1
+                return self._pinned[key]
+            if key in self._protected:
+                self.hits += 1
+                self._protected.move_to_end(key)
+                return self._protected[key]
+            if key in self._probation:
+                self.hits += 1
+                value = self._probation.pop(key)
+                self._promote(key, value)
+                return value
+            self.misses += 1
+
+        # Load outside the lock so slow decompression doesn't serialize readers
+        value = self._loader(key)
+        with self._lock:
+            if key not in self._pinned and key not in self._protected and key not in self._probation:
+                self._probation[key] = value
+                self._evict()
+        return value
+
+    def pin(self, key: Hashable):
+        """Load `key` if needed and keep it resident until invalidated."""
+        value = self._loader(key)
+        with self._lock:
+            self._probation.pop(key, None)
+            self._protected.pop(key, None)
+            self._pinned[key] = value
+
+    def invalidate(self, key: Hashable):
+        """Drop a stale entry; pinned entries are reloaded and stay pinned."""
+        with self._lock:
+            self._probation.pop(key, None)
+            self._protected.pop(key, None)
+            pinned = self._pinned.pop(key, None) is not None
+        if pinned:
+            self.pin(key)
+
+    def clear(self):
+        with self._lock:
+            self._probation.clear()
+            self._protected.clear()
+            self._pinned.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._probation) + len(self._protected),
+                "maxsize": self.maxsize,
+                "protected_size": len(self._protected),
+                "pinned_size": len(self._pinned),
+            }
+
+    def _promote(self, key, value):
+        self._protected[key] = value
+        if len(self._protected) > self._protected_max:
+            # Demote the coldest protected entry back to probation (MRU end)
+            old_key, old_value = self._protected.popitem(last=False)
+            self._probation[old_key] = old_value
+        self._evict()
+
+    def _evict(self):
+        while len(self._probation) + len(self._protected) > self.maxsize:
+            if self._probation:
+                self._probation.popitem(last=False)
+            else:
+                self._protected.popitem(last=False)
+
+
+@lru_cache(maxsize=512)
+def _sqlite_sql(query: str) -> str:
+    """Postgres-flavoured SQL as SQLite accepts it; memoized, the queries are a fixed set."""
+    # Replace BYTEA with BLOB if creating tables
+    return query.replace("%s", "?").replace("BYTEA", "BLOB")
+
+
+def _dict_row(cursor, row) -> dict:
+    """sqlite3 row_factory matching psycopg's dict_row: rows come back as plain dicts."""
+    return dict(zip([col[0] for col in cursor.description], row))
+
 
 class SqliteCursorAdapter:
     def __init__(self, cursor):
         self.cursor = cursor
         
     def execute(self, query, params=None):
-        query = query.replace("%s", "?")
-        # Replace BYTEA with BLOB if creating tables
-        query = query.replace("BYTEA", "BLOB")
+        query = _sqlite_sql(query)
         if params is None:
             self.cursor.execute(query)
         else:
@@ -28,20 +136,15 @@ class SqliteCursorAdapter:
         return self
         
     def executemany(self, query, params_seq):
-        query = query.replace("%s", "?")
-        self.cursor.executemany(query, params_seq)
+        self.cursor.executemany(_sqlite_sql(query), params_seq)
         return self
         
     def fetchone(self):
-        row = self.cursor.fetchone()
-        if row is None:
-            return None
-        # Convert to dict
-        return dict(row)
+        # Rows are already dicts (_dict_row), as with the Postgres pool
+        return self.cursor.fetchone()
         
     def fetchall(self):
-        rows = self.cursor.fetchall()
-        return [dict(row) for row in rows]
+        return self.cursor.fetchall()
         
     def copy(self, query):
         raise NotImplementedError("COPY not supported in SQLite")
@@ -50,13 +153,13 @@ class SqliteCursorAdapter:
         return getattr(self.cursor, name)
 
 class SqliteConnectionAdapter:
-    def __init__(self, conn):
+    def __init__(self, conn, lock=None):
         self.conn = conn
+        self._lock = lock
         
     def execute(self, query, params=None):
         cursor = self.conn.cursor()
-        query = query.replace("%s", "?")
-        query = query.replace("BYTEA", "BLOB") 
+        query = _sqlite_sql(query)
         if params is None:
             cursor.execute(query)
         else:
@@ -71,25 +174,71 @@ class SqliteConnectionAdapter:
         return SqliteCursorAdapter(self.conn.cursor())
         
     def __enter__(self):
+        if self._lock is not None:
+            self._lock.acquire()
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type:
-            self.conn.rollback()
-        else:
-            self.conn.commit()
+        try:
+            if exc_type:
+                self.conn.rollback()
+            else:
+                self.conn.commit()
+        finally:
+            if self._lock is not None:
+                self._lock.release()
 
 class SqlitePoolAdapter:
+    """
+    One long-lived connection shared by every `connection()` block, instead of
+    reopening the database (and its -wal/-shm files) per call. Blocks are
+    serialized by a re-entrant lock, so each commits or rolls back on its own.
+    """
     def __init__(self, db_path):
         self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = _dict_row
+        for pragma in (
+            "journal_mode=WAL",
+            "synchronous=NORMAL",
+            "temp_store=MEMORY",
+            "cache_size=-65536",  # 64 MiB
+            "mmap_size=268435456",  # 256 MiB
+        ):
+            self._conn.execute(f"PRAGMA {pragma}")
+        self._lock = threading.RLock()
         
     def connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return SqliteConnectionAdapter(conn)
+        return SqliteConnectionAdapter(self._conn, self._lock)
     
     def close(self, timeout=None):
-        pass
+        self._conn.close()
+
+
+POSTINGS_STATS_KEYS = ("num_terms", "postings_bytes", "avg_postings_bytes", "postings_entries")
+
+
+def refresh_postings_stats(cur, use_sqlite: bool = False) -> dict:
+    """
+    Materialize postings size stats (num_terms, postings_bytes,
+    avg_postings_bytes, postings_entries) into idx_globals so stats readers
+    don't scan idx_terms. Takes a dict-row cursor and returns the stats; the
+    caller commits. Writers call this once their idx_terms changes are in.
+    """
+    length = "LENGTH" if use_sqlite else "octet_length"
+    cur.execute(f"""
+        SELECT COUNT(*) AS num_terms,
+               COALESCE(SUM({length}(postings)), 0) AS postings_bytes,
+               COALESCE(AVG({length}(postings)), 0) AS avg_postings_bytes,
+               COALESCE(SUM(df), 0) AS postings_entries
+        FROM idx_terms
+    """)
+    stats = cur.fetchone()
+    cur.executemany("""
+        INSERT INTO idx_globals (key, value) VALUES (%s, %s)
+        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+    """, [(key, str(stats[key])) for key in POSTINGS_STATS_KEYS])
+    return stats
 
 
 class IndexStorage:
@@ -112,8 +261,10 @@ class IndexStorage:
         # Initialize schema if needed (safe to call repeatedly)
         self._init_schema()
         
-        # LRU cache for decompressed book chunks
-        self._get_book_chunks = lru_cache(maxsize=CACHE_MAX_BOOKS)(self._load_book_chunks)
+        # SLRU cache for decompressed book chunks
+        self._chunk_cache = SegmentedLRUCache(self._load_book_chunks, maxsize=CACHE_MAX_BOOKS)
+        if CACHE_PINNED_BOOKS > 0:
+            self.pin_popular_books(CACHE_PINNED_BOOKS)
 
     def __enter__(self):
         return self
@@ -262,7 +413,7 @@ class IndexStorage:
         compressed = self._cctx.compress(text.encode("utf-8"))
         self._get_chunk_path(book_id).write_bytes(compressed)
         # Invalidate cache for this book
-        self._get_book_chunks.cache_clear()
+        self._chunk_cache.invalidate(book_id)
 
     def _load_book_chunks(self, book_id: str) -> list[str] | None:
         """Load and decompress all chunks for a book (cached)."""
@@ -275,15 +426,33 @@ class IndexStorage:
 
     def get_chunk_text(self, book_id: str, local_chunk_id: int) -> str | None:
         """Get chunk text from cache or zstd file."""
-        chunks = self._get_book_chunks(book_id)
+        chunks = self._chunk_cache.get(book_id)
         if chunks and local_chunk_id < len(chunks):
             return chunks[local_chunk_id]
         return None
     
+    def pin_popular_books(self, limit: int):
+        """Keep chunks of the `limit` most-downloaded books permanently cached."""
+        # downloads is free text like "1234 downloads in the last 30 days"
+        if self.use_sqlite:
+            query = """
+                SELECT book_id FROM books WHERE downloads IS NOT NULL
+                ORDER BY CAST(downloads AS INTEGER) DESC LIMIT %s
+            """
+        else:
+            query = """
+                SELECT book_id FROM books WHERE downloads ~ '^[0-9]+'
+                ORDER BY substring(downloads from '^[0-9]+')::bigint DESC LIMIT %s
+            """
+        with self.pool.connection() as conn:
+            rows = conn.execute(query, (limit,)).fetchall()
+        for row in rows:
+            if self._get_chunk_path(row["book_id"]).exists():
+                self._chunk_cache.pin(row["book_id"])
+    
     def cache_stats(self) -> dict:
         """Return cache statistics."""
-        info = self._get_book_chunks.cache_info()
-        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+        return self._chunk_cache.stats()
 
     def insert_chunks_batch(self, chunks: list[tuple[int, str]]):
         """Insert (chunk_id, book_id) tuples."""
@@ -299,7 +468,9 @@ class IndexStorage:
                 conn.commit()
 
     def insert_terms_batch(self, terms: list[tuple[str, int, bytes]], merge: bool = False):
-        if not merge:
+        if merge:
+            self._merge_terms_batch(terms)
+        else:
             with self.pool.connection() as conn:
                 with conn.cursor() as cur:
                     if self.use_sqlite:
@@ -312,8 +483,12 @@ class IndexStorage:
                             ON CONFLICT (term) DO NOTHING
                         """, terms)
                 conn.commit()
-            return
         
+        with self.pool.connection() as conn:
+            refresh_postings_stats(conn.cursor(), self.use_sqlite)
+            conn.commit()
+
+    def _merge_terms_batch(self, terms: list[tuple[str, int, bytes]]):
         term_names = [t[0] for t in terms]
         # uses get_terms_batch, which we will fix
         existing = self.get_terms_batch(term_names)
@@ -55,6 +55,7 @@ def run_index_pipeline(
              ol_client = OpenLibraryClient()
              
              enrich_books_service(db_manager, ol_client, limit=limit)
+             ol_client.close()
              db_manager.close()
         except Exception as e:
              print(f"Enrichment failed: {e}")
@@ -70,7 +71,8 @@ def run_index_pipeline(
             shutil.rmtree(index_dir)
         Path(index_dir).mkdir(parents=True, exist_ok=True)
 
-    stopwords = list(load_stopwords())
+    # Rust takes any iterable of stopwords, so the cached frozenset goes in as is
+    stopwords = load_stopwords()
     
     print(f"Indexing files from {books_dir} to {index_dir}...")
     indexed, total_chunks = index_corpus_file(
@@ -89,14 +91,14 @@ def run_index_pipeline(
 
 def search(query: str, top_k: int = 10, use_sqlite: bool = False):
     index_dir = os.getenv("INDEX_DIR", "data/index")
-    stopwords = list(load_stopwords())
-    
     searcher = FileSearcher(index_dir)
-    searcher.set_stopwords(stopwords)
+    searcher.set_stopwords(load_stopwords())
     
     results = searcher.search(query, top_k * 10)
     
     db = PostgresRepository(use_sqlite=use_sqlite)
+    # Every candidate's metadata in one query rather than one per book
+    books = db.get_books_bulk("gutenberg", list(dict.fromkeys(r[0] for r in results)))
     seen_books = set()
     count = 0
     
@@ -105,7 +107,7 @@ def search(query: str, top_k: int = 10, use_sqlite: bool = False):
             continue
         seen_books.add(book_id)
         
-        meta = db.get_book("gutenberg", book_id)
+        meta = books.get(book_id)
         if meta:
             title = meta.get("title", "Unknown")
             author = meta.get("author", "Unknown")
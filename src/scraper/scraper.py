@@ -1,9 +1,42 @@
 import csv
 import re
+import threading
 from typing import Dict, Iterator, List
 
+import httpx
 import requests
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+_http_client: httpx.Client | None = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """
+    One keep-alive HTTP/2 pool shared by every thread (httpx.Client is
+    thread-safe), so metadata pages multiplex over a few connections to
+    gutenberg.org instead of a TLS handshake per request. Created on first
+    use rather than at import.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    http2=True,
+                    headers=HEADERS,
+                    timeout=30,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+                )
+    return _http_client
+
+
+_EBOOK_HREF_RE = re.compile(r'/ebooks/(\d+)')
 
 
 class GutenbergScraper:
@@ -11,10 +44,7 @@ class GutenbergScraper:
         self.base_url = "https://www.gutenberg.org"
 
     def fetch(self, url: str) -> str:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=30)
+        response = get_http_client().get(url)
         response.raise_for_status()
         return response.text
 
@@ -24,7 +54,8 @@ class GutenbergScraper:
     def extract_metadata(self, book_id: str) -> Dict[str, object]:
         url = self.get_book_url(book_id)
         html = self.fetch(url)
-        soup = BeautifulSoup(html, 'html.parser')
+        # Lexbor C parser; the page is only queried, so no Python tree is built
+        tree = LexborHTMLParser(html)
         
         metadata = {
             'source': 'gutenberg',
@@ -43,32 +74,32 @@ class GutenbergScraper:
             'files': []
         }
 
-        title_elem = soup.find('h1', {'id': 'book_title'})
+        title_elem = tree.css_first('h1#book_title')
         if title_elem:
-            title = title_elem.get_text(strip=True)
+            title = title_elem.text(strip=True)
             if ' by ' in title:
                 title = title.split(' by ')[0].strip()
             metadata['title'] = title
 
-        bibrec_table = soup.find('table', class_='bibrec')
+        bibrec_table = tree.css_first('table.bibrec')
         if bibrec_table:
-            for row in bibrec_table.find_all('tr'):
-                th = row.find('th')
-                td = row.find('td')
+            for row in bibrec_table.css('tr'):
+                th = row.css_first('th')
+                td = row.css_first('td')
                 if th and td:
-                    key = th.get_text(strip=True).lower()
-                    value = td.get_text(strip=True)
+                    key = th.text(strip=True).lower()
+                    value = td.text(strip=True)
                     
                     if key == 'author':
-                        author_link = td.find('a')
+                        author_link = td.css_first('a')
                         if author_link:
-                            metadata['author'] = author_link.get_text(strip=True)
+                            metadata['author'] = author_link.text(strip=True)
                         else:
                             metadata['author'] = value
                     elif key == 'illustrator':
-                        illustrator_link = td.find('a')
+                        illustrator_link = td.css_first('a')
                         if illustrator_link:
-                            metadata['illustrator'] = illustrator_link.get_text(strip=True)
+                            metadata['illustrator'] = illustrator_link.text(strip=True)
                         else:
                             metadata['illustrator'] = value
                     elif key == 'title':
@@ -88,16 +119,15 @@ class GutenbergScraper:
                     elif key == 'downloads':
                         metadata['downloads'] = value
 
-        files_table = soup.find('table', class_='files')
+        files_table = tree.css_first('table.files')
         if files_table:
-            for row in files_table.find_all('tr'):
-                link = row.find('a', class_='link')
+            for row in files_table.css('tr'):
+                link = row.css_first('a.link')
                 if link:
-                    href_value = link.get('href') or ""
-                    href = href_value[0] if isinstance(href_value, list) else str(href_value)
-                    text = link.get_text(strip=True)
+                    href = link.attributes.get('href') or ""
+                    text = link.text(strip=True)
                     if href:
-                        full_url = href if isinstance(href, str) and href.startswith('http') else f"{self.base_url}{href}"
+                        full_url = href if href.startswith('http') else f"{self.base_url}{href}"
                         metadata['files'].append({
                             'format': text,
                             'url': full_url
@@ -108,16 +138,15 @@ class GutenbergScraper:
     def search_books(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
         search_url = f"{self.base_url}/ebooks/search/?query={query}&submit_search=Go%21"
         html = self.fetch(search_url)
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = LexborHTMLParser(html)
         
         results = []
-        book_links = soup.find_all('a', href=re.compile(r'/ebooks/(\d+)'))
+        book_links = [link for link in tree.css('a[href]') if _EBOOK_HREF_RE.search(link.attributes.get('href') or "")]
         
         seen_ids = set()
         for link in book_links[:limit]:
-            href_value = link.get('href') or ""
-            href = href_value[0] if isinstance(href_value, list) else str(href_value)
-            match = re.search(r'/ebooks/(\d+)', href)
+            href = link.attributes.get('href') or ""
+            match = _EBOOK_HREF_RE.search(href)
             if match:
                 book_id = match.group(1)
                 if book_id not in seen_ids:
@@ -125,7 +154,7 @@ class GutenbergScraper:
                     results.append({
                         'source': 'gutenberg',
                         'book_id': str(book_id),
-                        'title': link.get_text(strip=True),
+                        'title': link.text(strip=True),
                         'url': f"{self.base_url}{href}"
                     })
         
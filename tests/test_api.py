@@ -1,3 +1,6 @@
+import json
+from contextlib import nullcontext
+
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock
@@ -15,6 +18,14 @@ class FakeRepository:
             return self.storage.get(book_id)
         return None
 
+    def get_books_bulk(self, source, ids):
+        if source != "gutenberg":
+            return {}
+        return {bid: self.storage[bid] for bid in ids if bid in self.storage}
+
+    def request_scope(self):
+        return nullcontext()
+
     def seed_book(self, book_id, title, author):
         self.storage[book_id] = {
             "source": "gutenberg",
@@ -29,11 +40,13 @@ class FakeRepository:
 class FakeSearcher:
     def __init__(self, index_dir):
         self.results = []
+        self.requested = []
 
     def set_stopwords(self, stopwords):
         pass
 
     def search(self, query, limit):
+        self.requested.append(limit)
         # Returns list of (book_id, score, chunk_id)
         # Filter results that match query if we wanted to be fancy,
         # but for mocking we just return pre-configured results
@@ -48,6 +61,8 @@ def api_client(monkeypatch):
     # Patch the global variables in api.main to point to our mocks
     monkeypatch.setattr(api_main, "database", repo)
     monkeypatch.setattr(api_main, "searcher", searcher)
+    api_main.search_cache.clear()
+    api_main.search_stats.reset()
     
     # Override lifespan to prevent real DB connection/Index loading
     from contextlib import asynccontextmanager
@@ -158,6 +173,83 @@ def test_search_deduplicates_chunks(api_client):
     assert results[0]["score"] == 0.9
 
 
+def test_search_applies_stored_popularity_score(api_client):
+    client, repo, searcher = api_client
+    repo.seed_book("1", "Obscure Tale", "Nobody")
+    repo.seed_book("2", "Famous Tale", "Somebody")
+    repo.storage["1"]["popularity_score"] = None
+    repo.storage["2"]["popularity_score"] = 2.0
+    
+    searcher.results = [("1", 0.8, 1), ("2", 0.5, 2)]
+    
+    results = client.get("/search", params={"query": "story"}).json()
+    
+    assert [r["book_id"] for r in results] == ["2", "1"]
+    assert results[0]["score"] == 0.5 * 2.0
+    assert results[1]["score"] == 0.8
+
+
+def test_search_serves_repeated_queries_from_cache(api_client):
+    client, repo, searcher = api_client
+    repo.seed_book("1", "Cached Book", "Author")
+    searcher.results = [("1", 0.5, 1)]
+    
+    first = client.get("/search", params={"query": "Cached "}).json()
+    
+    # Index changes are invisible until the entry expires or the cache is bypassed
+    searcher.results = []
+    assert client.get("/search", params={"query": "cached"}).json() == first
+    assert client.get("/search", params={"query": "cached", "use_cache": "false"}).json() == []
+
+
+def test_search_bypassing_cache_leaves_it_untouched(api_client):
+    client, repo, searcher = api_client
+    repo.seed_book("1", "Cached Book", "Author")
+    searcher.results = [("1", 0.5, 1)]
+    
+    assert client.get("/search", params={"query": "cached", "use_cache": "false"}).json() != []
+    assert len(api_main.search_cache) == 0
+    
+    first = client.get("/search", params={"query": "cached"}).json()
+    searcher.results = []
+    client.get("/search", params={"query": "cached", "use_cache": "false"})
+    assert client.get("/search", params={"query": "cached"}).json() == first
+
+
+def test_search_requeries_with_full_budget_when_dedupe_leaves_page_short(api_client):
+    client, repo, searcher = api_client
+    repo.seed_book("1", "Reprinted Classic", "Author")
+    repo.seed_book("2", "Other Book", "Writer")
+    
+    # Every hit in the small first budget belongs to the same book
+    searcher.results = [("1", 1.0 - i / 100, i) for i in range(10)] + [("2", 0.5, 99)]
+    
+    results = client.get("/search", params={"query": "x", "limit": 2}).json()
+    
+    assert [r["book_id"] for r in results] == ["1", "2"]
+    assert searcher.requested == [2 * 3, 2 * 20]
+    assert api_main.search_stats.oversample > 3
+
+
+def test_search_stream_sends_deduplicated_events(api_client, monkeypatch):
+    client, repo, searcher = api_client
+    monkeypatch.setattr(api_main, "STREAM_BATCH_SIZE", 2)
+    repo.seed_book("1", "Moby Dick", "Herman Melville")
+    repo.seed_book("2", "Moby Dick!", "Herman  Melville")
+    repo.seed_book("3", "Emma", "Jane Austen")
+    
+    # The duplicate edition lands in a later batch than the first one
+    searcher.results = [("1", 0.9, 1), ("3", 0.8, 2), ("2", 0.7, 3)]
+    
+    response = client.get("/search/stream", params={"query": "story"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    
+    events = [e for e in response.text.split("\n\n") if e]
+    assert events[-1] == "event: end\ndata: {}"
+    books = [json.loads(e.removeprefix("data: ")) for e in events[:-1]]
+    assert [b["book_id"] for b in books] == ["1", "3"]
+
+
 def test_realtime_add_document_disabled(api_client):
     """Test that add_document returns 400 when realtime mode is disabled."""
     client, _, _ = api_client
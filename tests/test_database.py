@@ -0,0 +1,140 @@
+"""Tests for the SQLAlchemy repository running on a temporary SQLite database."""
+import pytest
+from sqlalchemy import text
+
+from src.db.database import PostgresRepository
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_DB_PATH", str(tmp_path / "test.db"))
+    db = PostgresRepository(use_sqlite=True)
+    yield db
+    db.close()
+
+
+def seed(repo, book_id, title, author):
+    repo.upsert_book({
+        "source": "gutenberg",
+        "book_id": book_id,
+        "url": f"https://www.gutenberg.org/ebooks/{book_id}",
+        "title": title,
+        "author": author,
+    })
+
+
+def test_get_books_bulk(repo):
+    seed(repo, "1", "Moby Dick", "Herman Melville")
+    seed(repo, "2", "Emma", "Jane Austen")
+
+    books = repo.get_books_bulk("gutenberg", ["1", "2", "999"])
+
+    assert set(books) == {"1", "2"}
+    assert books["1"]["title"] == "Moby Dick"
+    assert books["2"]["author"] == "Jane Austen"
+
+
+def test_get_books_bulk_empty(repo):
+    assert repo.get_books_bulk("gutenberg", []) == {}
+
+
+def test_upsert_book_stores_normalized_keys(repo):
+    seed(repo, "1", "Moby-Dick; or, The Whale", "Melville,  Herman")
+
+    book = repo.get_book("gutenberg", "1")
+
+    assert book["title_norm"] == "mobydick or the whale"
+    assert book["author_norm"] == "melville herman"
+
+
+def test_book_cache_serves_repeat_reads_and_invalidates_on_upsert(repo):
+    seed(repo, "1", "Moby Dick", "Herman Melville")
+    seed(repo, "2", "Emma", "Jane Austen")
+    assert repo.get_book("gutenberg", "1")["title"] == "Moby Dick"
+
+    # Cached entries are served without touching the database
+    with repo.get_session() as session:
+        session.execute(text("UPDATE books SET title = 'Changed' WHERE book_id IN ('1', '2')"))
+    assert repo.get_book("gutenberg", "1")["title"] == "Moby Dick"
+    # Misses in a bulk fetch still go to the database
+    books = repo.get_books_bulk("gutenberg", ["1", "2"])
+    assert books["1"]["title"] == "Moby Dick"
+    assert books["2"]["title"] == "Changed"
+
+    seed(repo, "1", "Moby-Dick", "Herman Melville")
+    assert repo.get_book("gutenberg", "1")["title"] == "Moby-Dick"
+
+
+def test_book_cache_hands_out_copies(repo):
+    seed(repo, "1", "Moby Dick", "Herman Melville")
+    repo.clear_book_cache()
+
+    repo.get_book("gutenberg", "1")["title"] = "Edited"
+    repo.get_book("gutenberg", "1")["title"] = "Edited"
+    repo.get_books_bulk("gutenberg", ["1"])["1"]["title"] = "Edited"
+
+    assert repo.get_book("gutenberg", "1")["title"] == "Moby Dick"
+    assert repo.get_books_bulk("gutenberg", ["1"])["1"]["title"] == "Moby Dick"
+
+
+def test_get_top_book_ids_orders_by_popularity(repo):
+    for book_id in ("1", "2", "3"):
+        seed(repo, book_id, f"Book {book_id}", "Author")
+    with repo.get_session() as session:
+        session.execute(text("UPDATE books SET popularity_score = 1.5 WHERE book_id = '3'"))
+        session.execute(text("UPDATE books SET popularity_score = 1.1 WHERE book_id = '1'"))
+
+    assert repo.get_top_book_ids("gutenberg", 10) == ["3", "1", "2"]
+    assert repo.get_top_book_ids("gutenberg", 1) == ["3"]
+
+
+def test_api_warm_up_opens_connections_and_preloads_books(repo, monkeypatch, caplog):
+    import src.api.main as api_main
+
+    seed(repo, "1", "Moby Dick", "Herman Melville")
+    repo.clear_book_cache()
+    monkeypatch.setattr(api_main, "database", repo)
+    monkeypatch.setattr(api_main, "searcher", None)
+    monkeypatch.setattr(api_main, "WARMUP_CONNECTIONS", 3)
+
+    with caplog.at_level("WARNING", logger=api_main.logger.name):
+        api_main._warm_up()
+
+    assert "warm-up failed" not in caplog.text
+    assert repo.engine.pool.checkedin() >= 3
+    assert repo._cached_book(("gutenberg", "1"))["title"] == "Moby Dick"
+
+
+def test_request_scope_reuses_one_connection(repo):
+    seed(repo, "1", "Moby Dick", "Herman Melville")
+    seed(repo, "2", "Emma", "Jane Austen")
+    repo.clear_book_cache()
+
+    with repo.request_scope():
+        assert repo.engine.pool.checkedout() == 0
+        assert repo.get_book("gutenberg", "1")["title"] == "Moby Dick"
+        assert repo.engine.pool.checkedout() == 1
+        with repo.request_scope():
+            assert repo.get_books_bulk("gutenberg", ["2"])["2"]["title"] == "Emma"
+            assert repo.engine.pool.checkedout() == 1
+    assert repo.engine.pool.checkedout() == 0
+
+
+def test_upsert_books_bulk_inserts_and_updates(repo):
+    seed(repo, "1", "Old Title", "Author")
+    assert repo.get_book("gutenberg", "1")["title"] == "Old Title"
+
+    written = repo.upsert_books_bulk([
+        {"source": "gutenberg", "book_id": "1", "title": "Moby-Dick", "author": "Herman Melville"},
+        {"source": "gutenberg", "book_id": "2", "title": "Emma", "author": "Jane Austen", "files": [{"f": 1}]},
+        {"source": "gutenberg", "book_id": "2", "title": "Emma!", "author": "Jane Austen"},
+    ])
+
+    assert written == 2
+    books = repo.get_books_bulk("gutenberg", ["1", "2"])
+    assert books["1"]["title"] == "Moby-Dick"
+    assert books["1"]["title_norm"] == "mobydick"
+    assert books["1"]["title_lower"] == "moby-dick"
+    assert books["2"]["title"] == "Emma!"
+    assert books["2"]["author_norm"] == "jane austen"
+    assert books["2"]["cover_url"].endswith("pg2.cover.medium.jpg")
@@ -6,7 +6,7 @@ import sqlite3
 import json
 import os
 import time
-from src.enrichment.openlibrary import OpenLibraryClient, EnrichedMetadata
+from src.enrichment.openlibrary import OpenLibraryClient, EnrichedMetadata, popularity_from_fields
 from src.enrichment.schema import init_db
 
 class TestOpenLibraryLocal(unittest.TestCase):
@@ -36,8 +36,8 @@ class TestOpenLibraryLocal(unittest.TestCase):
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, sample_work)
         
-        # Force FTS rebuild if trigger didn't fire immediately (though it should)
-        cursor.execute("INSERT INTO works_fts(works_fts) VALUES('rebuild')")
+        # works_fts is contentless; process_dump fills it the same way
+        cursor.execute("INSERT INTO works_fts(rowid, title) SELECT rowid, title FROM works")
         
         conn.commit()
         conn.close()
@@ -68,6 +68,40 @@ class TestOpenLibraryLocal(unittest.TestCase):
         meta = self.client.enrich_book("Nonexistent Book", "Nobody")
         self.assertIsNone(meta)
 
+    def test_enrich_book_prefers_exact_title(self):
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("""
+        INSERT INTO works (key, title, authors, ratings_average, ratings_count, want_to_read_count, edition_count, subjects)
+        VALUES ('OL456W', 'The Great Gatsby Study Guide', '[]', 3.0, 10, 50, 90, '[]')
+        """)
+        conn.execute("INSERT INTO works_fts(rowid, title) SELECT rowid, title FROM works WHERE key = 'OL456W'")
+        conn.commit()
+        conn.close()
+
+        meta = self.client.enrich_book("The Great Gatsby", "F. Scott Fitzgerald")
+        self.assertIsNotNone(meta)
+        self.assertEqual(meta.edition_count, 20)
+
+    def test_enrich_book_finds_exact_title_beyond_candidate_sample(self):
+        from src.enrichment.openlibrary import FTS_CANDIDATES
+        conn = sqlite3.connect(self.test_db)
+        # More partial matches than the candidate sample, all before the exact one in rowid order
+        conn.executemany("""
+        INSERT INTO works (key, title, authors, ratings_average, ratings_count, want_to_read_count, edition_count, subjects)
+        VALUES (?, ?, '[]', 1.0, 1, 1, 1, '[]')
+        """, [(f"OL{i}X", f"Emma Volume {i}") for i in range(FTS_CANDIDATES * 2)])
+        conn.execute("""
+        INSERT INTO works (key, title, authors, ratings_average, ratings_count, want_to_read_count, edition_count, subjects)
+        VALUES ('OL789W', 'Emma.', '[]', 4.0, 500, 9000, 300, '[]')
+        """)
+        conn.execute("INSERT INTO works_fts(rowid, title) SELECT rowid, title FROM works WHERE key != 'OL123W'")
+        conn.commit()
+        conn.close()
+
+        meta = self.client.enrich_book("Emma", "Jane Austen")
+        self.assertIsNotNone(meta)
+        self.assertEqual(meta.edition_count, 300)
+
     def test_popularity_score(self):
         meta = EnrichedMetadata(
             ratings_average=5.0,
@@ -77,6 +111,12 @@ class TestOpenLibraryLocal(unittest.TestCase):
         )
         score = meta.popularity_score()
         self.assertAlmostEqual(score, 1.6)
+        self.assertEqual(popularity_from_fields(5.0, 100, 10000, 100), score)
+
+    def test_popularity_from_fields_ignores_missing_signals(self):
+        self.assertEqual(popularity_from_fields(None, None, None, None), 1.0)
+        # Ratings below the count threshold don't count
+        self.assertEqual(popularity_from_fields(5.0, 3, None, None), 1.0)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,71 @@
+"""Tests for the Rust rank_with_boosts helper (boosts + book dedupe)."""
+import pytest
+
+from rust_bm25 import rank_with_boosts
+
+
+class TestRankWithBoosts:
+    """Test suite for rank_with_boosts."""
+
+    def test_title_boost(self):
+        raw = [("1", 1.0, 0), ("2", 1.2, 0)]
+        meta = {"1": ("Moby Dick", "Herman Melville"), "2": ("Emma", "Jane Austen")}
+
+        results = rank_with_boosts(raw, meta, "moby", 10)
+
+        assert results[0][1] == "1"
+        assert results[0][0] == pytest.approx(1.5)
+
+    def test_author_boost(self):
+        raw = [("1", 1.0, 0)]
+        meta = {"1": ("Emma", "Jane Austen")}
+
+        results = rank_with_boosts(raw, meta, "austen novels", 10)
+
+        assert results == [(pytest.approx(2.0), "1")]
+
+    def test_dedupes_by_normalized_title_and_author(self):
+        raw = [("1", 0.5, 0), ("2", 0.9, 3), ("1", 0.7, 1)]
+        meta = {
+            "1": ("Moby-Dick!", "Melville, Herman"),
+            "2": ("MobyDick", "Melville  Herman"),
+        }
+
+        results = rank_with_boosts(raw, meta, "whale", 10)
+
+        assert results == [(pytest.approx(0.9), "2")]
+
+    def test_skips_missing_metadata_and_truncates(self):
+        raw = [("1", 3.0, 0), ("2", 2.0, 0), ("3", 1.0, 0), ("4", 4.0, 0)]
+        meta = {"1": ("A", "X"), "2": ("B", "Y"), "3": ("C", "Z")}
+
+        results = rank_with_boosts(raw, meta, "query", 2)
+
+        assert [book_id for _, book_id in results] == ["1", "2"]
+
+    def test_ties_keep_first_seen_order(self):
+        raw = [(str(i), 1.0, 0) for i in range(6)]
+        meta = {str(i): (f"Title {i}", f"Author {i}") for i in range(6)}
+
+        results = rank_with_boosts(raw, meta, "query", 4)
+
+        assert [book_id for _, book_id in results] == ["0", "1", "2", "3"]
+
+    def test_applies_popularity_multiplier(self):
+        raw = [("1", 1.0, 0), ("2", 0.6, 0)]
+        meta = {"1": ("A", "X"), "2": ("B", "Y")}
+
+        results = rank_with_boosts(raw, meta, "query", 10, {"2": 2.0})
+
+        assert results == [(pytest.approx(1.2), "2"), (pytest.approx(1.0), "1")]
+
+    def test_accepts_precomputed_keys(self):
+        raw = [("1", 1.0, 0), ("2", 0.8, 0)]
+        meta = {
+            "1": ("moby dick", "moby dick", "herman melville"),
+            "2": ("Moby-Dick!", "Melville  Herman"),
+        }
+
+        results = rank_with_boosts(raw, meta, "melville", 10)
+
+        assert results == [(pytest.approx(2.0), "1"), (pytest.approx(1.6), "2")]